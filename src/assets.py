@@ -0,0 +1,99 @@
+import hashlib
+import os
+import posixpath
+import re
+
+import jsonfile
+
+
+ASSETS_PATH = '.build/assets.json'
+MANIFEST_NAME = 'asset-manifest.json'
+HASH_LENGTH = 10
+# name.0123456789.ext, as written by fingerprint()
+HASHED_RE = re.compile(r'\.[0-9a-f]{%d}\.[^./]+$' % HASH_LENGTH)
+SUFFIX_RE = re.compile(r'[?#]')
+REF_RE = re.compile(r'((?:href|src)=")([^"?#]+)')
+
+_mapping = {}
+_version = ''
+
+
+def enable(records):
+    global _mapping, _version
+    _mapping = {url: record["url"] for url, record in records.items()}
+    h = hashlib.sha256()
+    for url, hashed in sorted(_mapping.items()):
+        h.update(f'{url}\0{hashed}\0'.encode())
+    _version = h.hexdigest()[:16]
+
+
+def disable():
+    global _mapping, _version
+    _mapping = {}
+    _version = ''
+
+
+def version():
+    return _version
+
+
+def asset_url(url):
+    if not _mapping:
+        return url
+    path = SUFFIX_RE.split(url, 1)[0]
+    hashed = _mapping.get(path)
+    if hashed is None:
+        return url
+    return hashed + url[len(path):]
+
+
+def rewrite_html(html):
+    if not _mapping:
+        return html
+    return REF_RE.sub(lambda match: match.group(1) + _mapping.get(match.group(2), match.group(2)), html)
+
+
+def hashed_name(url, digest):
+    root, ext = posixpath.splitext(url)
+    return f'{root}.{digest[:HASH_LENGTH]}{ext}'
+
+
+def load_assets(path=ASSETS_PATH):
+    records = jsonfile.read_json(path, {})
+    return records if isinstance(records, dict) else {}
+
+
+def save_assets(records, path=ASSETS_PATH, public='public'):
+    if not records:
+        for target in (path, f'{public}/{MANIFEST_NAME}'):
+            if os.path.exists(target):
+                os.remove(target)
+        return
+    jsonfile.write_json_atomic(path, records)
+    jsonfile.write_json_atomic(f'{public}/{MANIFEST_NAME}', {url: record["url"] for url, record in records.items()})
+
+
+def fingerprint(static, public, previous, mode='reflink', outputs=None):
+    import manifest
+    import static_sync
+    records = {}
+    changed = []
+    for source, entry in sorted(static.items()):
+        url = entry["dest"][len(public):]
+        old = previous.get(url)
+        if old and old["size"] == entry["size"] and old["mtime"] == entry["mtime"]:
+            digest = old["hash"]
+        else:
+            digest = manifest.hash_file(source)
+        hashed = hashed_name(url, digest)
+        dest = f'{public}{hashed}'
+        exists = dest in outputs if outputs is not None else os.path.exists(dest)
+        if not exists:
+            static_sync.sync_file(source, dest, mode)
+        records[url] = {"hash": digest, "size": entry["size"], "mtime": entry["mtime"], "url": hashed, "dest": dest}
+        if old is None or old["url"] != hashed:
+            changed.append(url)
+    removed = [url for url in previous if url not in records]
+    stale = [previous[url]["dest"] for url in changed + removed
+             if url in previous and previous[url]["dest"] != records.get(url, {}).get("dest")]
+    return records, changed + removed, sorted(stale)
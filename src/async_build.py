@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import fragments
+import helper_functions
+import links
+import profiling
+import site_index
+
+
+QUEUE_SIZE = 64
+
+
+def read_page(from_path):
+    # Huge pages are left to the streaming renderer instead of being
+    # held in the queue.
+    if os.path.getsize(from_path) > helper_functions.STREAM_THRESHOLD:
+        return None
+    with open(from_path) as fh:
+        return fh.read()
+
+
+def render_page(from_path, markdown, template_path, dest_path, collect=False, share=False):
+    profiling.begin_page()
+    with links.collecting() as refs, (site_index.collecting() if collect else nullcontext([])) as info, \
+            (fragments.recording() if share else nullcontext()) as recorded:
+        try:
+            if markdown is None:
+                helper_functions.generate_page(from_path, template_path, dest_path, quiet=True)
+                text = None
+            else:
+                text = helper_functions.render_page(markdown, template_path)
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}", profiling.end_page(), (refs, None, None)
+    return text, None, profiling.end_page(), (refs, info[0] if info else None, recorded.delta if share else None)
+
+
+def write_page(dest_path, text):
+    tmp_path = f"{dest_path}.tmp"
+    try:
+        with open(tmp_path, 'w') as fh:
+            fh.write(text)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dest_path)
+
+
+def make_dirs(pages):
+    folders = {os.path.dirname(dest) for _, dest in pages}
+    for folder in sorted(folder for folder in folders if folder):
+        os.makedirs(folder, exist_ok=True)
+    return len(folders)
+
+
+async def pipeline(pages, template_path, render_executor, io_executor, io_concurrency=8, render_concurrency=2, queue_size=QUEUE_SIZE, collect=False, share=False):
+    loop = asyncio.get_running_loop()
+    to_render = asyncio.Queue(queue_size)
+    to_write = asyncio.Queue(queue_size)
+    results = {}
+    done = 0
+
+    async def reader(items):
+        for i, (from_path, dest_path) in items:
+            start = time.perf_counter()
+            try:
+                markdown = await loop.run_in_executor(io_executor, read_page, from_path)
+            except Exception as e:
+                await to_write.put((i, None, f"{type(e).__name__}: {e}", None, ([], None, None)))
+                continue
+            await to_render.put((i, markdown, time.perf_counter() - start))
+
+    async def renderer():
+        while True:
+            i, markdown, read_seconds = await to_render.get()
+            from_path, dest_path = pages[i]
+            try:
+                text, error, stages, collected = await loop.run_in_executor(
+                    render_executor, render_page, from_path, markdown, template_path, dest_path, collect, share)
+            except Exception as e:
+                # A broken pool fails every page left, but the queues still drain.
+                text, error, stages, collected = None, f"{type(e).__name__}: {e}", None, ([], None, None)
+            try:
+                if stages is not None:
+                    stages["read"] = stages.get("read", 0.0) + read_seconds
+                await to_write.put((i, text, error, stages, collected))
+            finally:
+                to_render.task_done()
+
+    async def writer():
+        nonlocal done
+        while True:
+            i, text, error, stages, collected = await to_write.get()
+            from_path, dest_path = pages[i]
+            if text is not None:
+                start = time.perf_counter()
+                try:
+                    await loop.run_in_executor(io_executor, write_page, dest_path, text)
+                except OSError as e:
+                    error = f"{type(e).__name__}: {e}"
+                if stages is not None:
+                    seconds = time.perf_counter() - start
+                    stages["write"] = stages.get("write", 0.0) + seconds
+                    stages["total"] += seconds
+            results[i] = (error, stages, collected)
+            done += 1
+            profiling.page_done(done, len(pages), f"Generating page from {from_path} to {dest_path} using {template_path}")
+            to_write.task_done()
+
+    items = list(enumerate(pages))
+    readers = [asyncio.create_task(reader(items[n::io_concurrency])) for n in range(io_concurrency)]
+    workers = [asyncio.create_task(renderer()) for _ in range(render_concurrency)]
+    workers += [asyncio.create_task(writer()) for _ in range(io_concurrency)]
+    try:
+        await asyncio.gather(*readers)
+        await to_render.join()
+        await to_write.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    return [results[i] for i in range(len(pages))]
+
+
+def run(pages, template_path, jobs=1, io_concurrency=8, queue_size=QUEUE_SIZE, references=None, page_info=None):
+    if not pages:
+        return []
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    io_concurrency = max(1, io_concurrency)
+    make_dirs(pages)
+    if jobs > 1:
+        render_executor = ProcessPoolExecutor(max_workers=min(jobs, len(pages)), initializer=helper_functions.init_worker,
+                                              initargs=(helper_functions.worker_state(),))
+    else:
+        render_executor = ThreadPoolExecutor(max_workers=1)
+    io_executor = ThreadPoolExecutor(max_workers=io_concurrency)
+    try:
+        # Two renders in flight per worker keeps the pool busy while the
+        # writers drain finished pages.
+        results = asyncio.run(pipeline(pages, template_path, render_executor, io_executor,
+                                       io_concurrency, jobs * 2, queue_size, page_info is not None, jobs > 1))
+    finally:
+        render_executor.shutdown()
+        io_executor.shutdown()
+    errors = []
+    profiler = profiling.active()
+    for (from_path, dest_path), (error, stages, (refs, info, delta)) in zip(pages, results):
+        fragments.merge(delta)
+        if profiler and stages:
+            profiler.add_page(from_path, stages)
+        if references is not None and not error:
+            references[dest_path] = refs
+        if page_info is not None and info is not None:
+            page_info[dest_path] = info
+        if error:
+            print(f"Failed to generate {from_path}: {error}")
+            errors.append((from_path, error))
+    return errors
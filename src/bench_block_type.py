@@ -0,0 +1,74 @@
+import random
+import re
+import sys
+import timeit
+
+import benchmark
+import helper_functions
+from helper_functions import BlockNode, BlockType
+
+
+def block_to_block_type_legacy(block):
+    # The classifier before the pattern registry: up to three separate checks
+    # per line, with the ordered-list regex going through the re module cache.
+    def check_type(cur_block_type, prev_block_type):
+        if prev_block_type in (None, cur_block_type):
+            return True
+        return False
+    block_type = None
+    start = None
+    lines = block.split('\n')
+    if block.startswith("`") and block.endswith("`"):
+        lines = []
+        block_type = BlockType.code
+    if len(lines) == 1 and (match := re.match(r'(^#+)(?: )', lines[0])):
+        return BlockNode(lines[0][match.end():], BlockType.heading, level=len(match.group(1)))
+    for line in lines:
+        if line[0] == '>' and check_type(BlockType.quote, block_type):
+            block_type = BlockType.quote
+        elif line[:2] in ("* ", "- ") and check_type(BlockType.unordered_list, block_type):
+            block_type = BlockType.unordered_list
+        elif (s := re.match(r'^(\d+)\. ', line)) and check_type(BlockType.ordered_list, block_type):
+            if start == None:
+                start = 0
+            if int(s.groups()[0]) == start + 1:
+                start += 1
+                block_type = BlockType.ordered_list
+            else:
+                start = None
+                block_type = BlockType.paragraph
+        else:
+            block_type = BlockType.paragraph
+            break
+    return BlockNode(block, block_type, level=start)
+
+
+def corpus_blocks(pages, shape):
+    rng = random.Random(0)
+    blocks = []
+    for _ in range(pages):
+        blocks.extend(helper_functions.markdown_to_blocks(benchmark.page(rng, shape, 30)))
+    return blocks
+
+
+def main(pages=200):
+    print(f"{'shape':>8} {'blocks':>7} {'lines':>7} {'legacy ns/line':>15} {'current ns/line':>16} {'speedup':>8}")
+    for shape in ('mixed', 'lists'):
+        blocks = corpus_blocks(pages, shape)
+        for block in blocks:
+            if block_to_block_type_legacy(block) != helper_functions.block_to_block_type(block):
+                raise Exception(f"classifiers disagree on {block!r}")
+        lines = sum(block.count('\n') + 1 for block in blocks)
+
+        legacy = current = None
+        # Alternate the two so drift in machine load hits both equally.
+        for _ in range(15):
+            a = timeit.timeit(lambda: [block_to_block_type_legacy(block) for block in blocks], number=1) / lines
+            b = timeit.timeit(lambda: [helper_functions.block_to_block_type(block) for block in blocks], number=1) / lines
+            legacy = a if legacy is None else min(legacy, a)
+            current = b if current is None else min(current, b)
+        print(f"{shape:>8} {len(blocks):>7} {lines:>7} {legacy * 1e9:>15.0f} {current * 1e9:>16.0f} {legacy / current:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,58 @@
+import random
+import sys
+import time
+import tracemalloc
+
+import benchmark
+import helper_functions
+import htmlnode
+from htmlnode import HTMLNode
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, HTMLNode):
+            count += 1
+            stack.extend(current.children or ())
+    return count
+
+
+def large_page(blocks, seed=0):
+    rng = random.Random(seed)
+    return benchmark.page(rng, 'huge', blocks)
+
+
+def main(blocks=5000):
+    markdown = large_page(blocks)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    node = helper_functions.markdown_to_html_node(markdown)
+    tree_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    nodes = count_nodes(node)
+    text_nodes = helper_functions.text_to_textnodes(markdown)
+    start = time.perf_counter()
+    node_copy = helper_functions.markdown_to_html_node(markdown)
+    build = time.perf_counter() - start
+    htmlnode.validate = False
+    start = time.perf_counter()
+    helper_functions.markdown_to_html_node(markdown)
+    build_unchecked = time.perf_counter() - start
+    htmlnode.validate = True
+    start = time.perf_counter()
+    equal = node == node_copy
+    compare = time.perf_counter() - start
+    print(f"markdown:         {len(markdown) / 1e6:.2f} MB, {blocks} blocks")
+    print(f"html nodes:       {nodes}")
+    print(f"tree memory:      {tree_bytes / 1e6:.2f} MB ({tree_bytes / nodes:.0f} bytes/node)")
+    print(f"HTMLNode size:    {sys.getsizeof(node)} bytes")
+    print(f"TextNode size:    {sys.getsizeof(text_nodes[0])} bytes")
+    print(f"tree build:       {build * 1000:.1f} ms ({build_unchecked * 1000:.1f} ms without validation)")
+    print(f"tree equality:    {compare * 1000:.1f} ms ({equal})")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
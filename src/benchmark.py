@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import helper_functions
+import htmlnode
+import profiling
+
+
+SHAPES = ('small', 'huge', 'lists', 'links', 'deep', 'mixed')
+WORDS = ("the ring hobbit shire wizard elf dwarf mountain river road forest king sword song tale "
+         "shadow light fellowship quest journey tower gate bridge valley star").split()
+
+
+def sentence(rng, words=12):
+    out = []
+    for i in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < 0.05:
+            word = f"**{word}**"
+        elif roll < 0.09:
+            word = f"_{word}_"
+        elif roll < 0.11:
+            word = f"`{word}`"
+        out.append(word)
+    return " ".join(out).capitalize() + "."
+
+
+def link(rng):
+    return f"[{rng.choice(WORDS)}](/{rng.choice(WORDS)}/{rng.choice(WORDS)})"
+
+
+def block(rng, kind):
+    if kind == 'heading':
+        return f"{'#' * rng.randint(2, 4)} {sentence(rng, 4)}"
+    if kind == 'paragraph':
+        return " ".join(sentence(rng) for _ in range(rng.randint(2, 6)))
+    if kind == 'ulist':
+        return "\n".join(f"- {sentence(rng, 6)}" for _ in range(rng.randint(3, 12)))
+    if kind == 'olist':
+        return "\n".join(f"{i}. {sentence(rng, 6)}" for i in range(1, rng.randint(3, 12) + 1))
+    if kind == 'links':
+        return " ".join(f"{sentence(rng, 4)} {link(rng)}" for _ in range(rng.randint(3, 10)))
+    if kind == 'image':
+        return f"![{rng.choice(WORDS)}](/images/{rng.choice(WORDS)}.png)"
+    if kind == 'quote':
+        return "\n".join(f"> {sentence(rng, 8)}" for _ in range(rng.randint(1, 4)))
+    if kind == 'code':
+        return "```\n" + "\n".join(f"print('{rng.choice(WORDS)}')" for _ in range(rng.randint(2, 8))) + "\n```"
+    raise ValueError(f"Unknown block kind {kind}")
+
+
+BLOCK_MIX = {
+    'small': ('heading', 'paragraph', 'paragraph', 'ulist', 'image'),
+    'huge': ('heading', 'paragraph', 'paragraph', 'ulist', 'olist', 'quote', 'code', 'links'),
+    'lists': ('heading', 'ulist', 'olist', 'ulist', 'olist'),
+    'links': ('heading', 'links', 'links', 'paragraph'),
+    'deep': ('heading', 'paragraph', 'ulist'),
+    'mixed': ('heading', 'paragraph', 'ulist', 'olist', 'quote', 'code', 'links', 'image'),
+}
+
+
+def page(rng, shape, blocks):
+    parts = [f"# {sentence(rng, 5)}"]
+    parts.extend(block(rng, rng.choice(BLOCK_MIX[shape])) for _ in range(blocks))
+    return "\n\n".join(parts) + "\n"
+
+
+def generate_corpus(root, shape='mixed', pages=200, seed=0):
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown corpus shape {shape}")
+    rng = random.Random(seed)
+    total = 0
+    for i in range(pages):
+        if shape == 'deep':
+            folder = "/".join(f"d{(i >> level) % 4}" for level in range(8))
+        else:
+            folder = f"section{i % 16}"
+        blocks = rng.randint(200, 400) if shape == 'huge' else rng.randint(5, 30)
+        text = page(rng, shape, blocks)
+        path = f"{root}/{folder}/page{i}.md"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as fh:
+            fh.write(text)
+        total += len(text.encode())
+    return total
+
+
+def read_corpus(root):
+    docs = []
+    for from_path, _ in helper_functions.discover_pages(root, ''):
+        with open(from_path) as fh:
+            docs.append(fh.read())
+    return docs
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def result(seconds, pages, size):
+    return {"seconds": seconds, "pages_per_s": pages / seconds, "mb_per_s": size / seconds / 1e6}
+
+
+def run(shape='mixed', pages=200, seed=0, repeat=3, jobs=1):
+    with tempfile.TemporaryDirectory() as tmp:
+        content = f"{tmp}/content"
+        size = generate_corpus(content, shape, pages, seed)
+        docs = read_corpus(content)
+        paragraphs = [block for doc in docs for block in helper_functions.markdown_to_blocks(doc)]
+        nodes = [helper_functions.markdown_to_html_node(doc) for doc in docs]
+        template = f"{tmp}/template.html"
+        with open(template, 'w') as fh:
+            fh.write("<html><title>{{ Title }}</title><body>{{ Content }}</body></html>")
+
+        def text_to_textnodes():
+            for paragraph in paragraphs:
+                helper_functions.text_to_textnodes(paragraph)
+
+        def markdown_to_html_node():
+            for doc in docs:
+                helper_functions.markdown_to_html_node(doc)
+
+        def to_html():
+            for node in nodes:
+                node.to_html()
+
+        def build():
+            helper_functions.generate_pages_recursive(content, template, f"{tmp}/public", jobs)
+
+        output = profiling.output
+        profiling.set_output('quiet')
+        try:
+            results = {
+                "text_to_textnodes": result(timed(text_to_textnodes, repeat), pages, size),
+                "markdown_to_html_node": result(timed(markdown_to_html_node, repeat), pages, size),
+                "to_html": result(timed(to_html, repeat), pages, size),
+                "build": result(timed(build, repeat), pages, size),
+            }
+        finally:
+            profiling.set_output(output)
+    return {"shape": shape, "pages": pages, "seed": seed, "bytes": size, "jobs": jobs, "results": results}
+
+
+def deep_tree(depth):
+    node = htmlnode.LeafNode("li", "leaf")
+    for level in range(depth):
+        node = htmlnode.ParentNode("ul" if level % 2 else "blockquote", [node])
+    return node
+
+
+def wide_tree(width):
+    return htmlnode.ParentNode("ul", [htmlnode.LeafNode("li", str(i)) for i in range(width)])
+
+
+def run_trees(depth=5000, width=1000000, repeat=3):
+    validate = htmlnode.validate
+    htmlnode.validate = False
+    try:
+        trees = {"deep": (deep_tree(depth), deep_tree(depth)), "wide": (wide_tree(width), wide_tree(width))}
+    finally:
+        htmlnode.validate = validate
+    results = {}
+    for name, (tree, copy) in trees.items():
+        results[f"{name}_to_html"] = {"seconds": timed(tree.to_html, repeat)}
+        results[f"{name}_repr"] = {"seconds": timed(lambda: repr(tree), repeat)}
+        results[f"{name}_eq"] = {"seconds": timed(lambda: tree == copy, repeat)}
+    return {"depth": depth, "width": width, "results": results}
+
+
+def format_trees(report):
+    lines = [f"trees: depth={report['depth']} width={report['width']}"]
+    for name, entry in report["results"].items():
+        lines.append(f"{name:<22} {entry['seconds'] * 1000:10.2f} ms")
+    return "\n".join(lines)
+
+
+def startup(repeat=5):
+    # Wall time of a fresh interpreter rendering one page, as the CMS sees it.
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    with tempfile.TemporaryDirectory() as tmp:
+        page_path = f"{tmp}/page.md"
+        with open(page_path, 'w') as fh:
+            fh.write(page(random.Random(0), 'small', 10))
+        template = f"{tmp}/template.html"
+        with open(template, 'w') as fh:
+            fh.write("<html><title>{{ Title }}</title><body>{{ Content }}</body></html>")
+        command = [sys.executable, main_path, 'render-one', page_path, '--template', template, '-o', f"{tmp}/page.html"]
+        return timed(lambda: subprocess.run(command, check=True), repeat)
+
+
+def compare(current, baseline, threshold=0.1):
+    regressions = []
+    lines = []
+    for key in ("shape", "pages", "seed", "jobs"):
+        if current.get(key) != baseline.get(key):
+            lines.append(f"warning: baseline {key}={baseline.get(key)} differs from current {key}={current.get(key)}")
+    for name, entry in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            lines.append(f"{name:<22} {entry['seconds'] * 1000:10.2f} ms  (no baseline)")
+            continue
+        change = entry["seconds"] / old["seconds"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        lines.append(f"{name:<22} {entry['seconds'] * 1000:10.2f} ms  vs {old['seconds'] * 1000:10.2f} ms  {change:+7.1%}{flag}")
+    return regressions, "\n".join(lines)
+
+
+def format_results(report):
+    lines = [f"corpus: shape={report['shape']} pages={report['pages']} size={report['bytes'] / 1e6:.2f} MB"]
+    for name, entry in report["results"].items():
+        lines.append(f"{name:<22} {entry['seconds'] * 1000:10.2f} ms {entry['pages_per_s']:10.1f} pages/s {entry['mb_per_s']:8.2f} MB/s")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the site generator on a synthetic corpus")
+    parser.add_argument('--shape', choices=SHAPES, default='mixed')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--jobs', '-j', type=int, default=1)
+    parser.add_argument('--save', metavar='FILE', help="save the results as a baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare against a saved baseline")
+    parser.add_argument('--threshold', type=float, default=0.1, help="slowdown ratio reported as a regression")
+    parser.add_argument('--generate', metavar='DIR', help="only write the corpus to DIR")
+    parser.add_argument('--trees', action='store_true', help="time serialization, repr and equality of synthetic node trees")
+    parser.add_argument('--depth', type=int, default=5000, help="nesting depth of the deep tree for --trees")
+    parser.add_argument('--width', type=int, default=1000000, help="children of the wide tree for --trees")
+    parser.add_argument('--startup', action='store_true', help="time render-one in a fresh interpreter against main.STARTUP_BUDGET")
+    args = parser.parse_args(argv)
+    if args.startup:
+        import main
+        seconds = startup(args.repeat)
+        print(f"render-one startup {seconds * 1000:.1f} ms, budget {main.STARTUP_BUDGET * 1000:.0f} ms")
+        return 1 if seconds > main.STARTUP_BUDGET else 0
+    if args.trees:
+        print(format_trees(run_trees(args.depth, args.width, args.repeat)))
+        return 0
+    if args.generate:
+        size = generate_corpus(args.generate, args.shape, args.pages, args.seed)
+        print(f"Wrote {args.pages} pages ({size / 1e6:.2f} MB) to {args.generate}")
+        return 0
+    report = run(args.shape, args.pages, args.seed, args.repeat, args.jobs)
+    print(format_results(report))
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(report, fh, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressions, text = compare(report, baseline, args.threshold)
+        print(text)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import os
+from collections import namedtuple
+
+
+PAGE = 'page'
+STATIC = 'static'
+OUTPUT = 'output'
+
+Entry = namedtuple('Entry', ('source', 'dest', 'kind', 'size', 'mtime'))
+
+
+def page_dest(dest):
+    root, ext = os.path.splitext(dest)
+    return f'{root}.html' if ext == '.md' else dest
+
+
+def scan(src, dst, kind):
+    # DirEntry answers is_dir/is_file from the directory listing, so each
+    # file costs a single stat for its size and mtime.
+    entries = []
+    with os.scandir(src) as it:
+        items = sorted(it, key=lambda item: item.name)
+    for item in items:
+        source = f'{src}/{item.name}'
+        dest = f'{dst}/{item.name}'
+        try:
+            if item.is_dir():
+                entries.extend(scan(source, dest, kind))
+                continue
+            if not item.is_file():
+                continue
+            st = item.stat()
+        except FileNotFoundError:
+            continue
+        if kind == PAGE:
+            dest = page_dest(dest)
+        entries.append(Entry(source, dest, kind, st.st_size, st.st_mtime_ns))
+    return entries
+
+
+def make_plan(content='content', static='static', public='public'):
+    if not os.path.exists(static):
+        raise Exception(f'Where is {static}??')
+    return scan(content, public, PAGE) + scan(static, public, STATIC)
+
+
+def scan_outputs(public='public'):
+    try:
+        return {entry.source: entry for entry in scan(public, public, OUTPUT)}
+    except FileNotFoundError:
+        return {}
+
+
+def of_kind(plan, kind):
+    return [entry for entry in plan if entry.kind == kind]
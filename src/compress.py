@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+TEXT_EXTENSIONS = ('.html', '.css', '.js', '.svg', '.xml', '.txt', '.json')
+SUFFIXES = ('.gz', '.br') if brotli else ('.gz',)
+
+PRESERVE_RE = re.compile(r'(<(pre|code|textarea|script|style)\b.*?</\2\s*>)', re.S | re.I)
+COMMENT_RE = re.compile(r'<!--(?!\[).*?-->', re.S)
+SPACE_RE = re.compile(r'\s+')
+# Whitespace next to block level tags is never rendered.
+BLOCK_TAGS = ('html|head|body|title|meta|link|div|p|h[1-6]|ul|ol|li|blockquote|article|section|nav|'
+              'header|footer|main|aside|table|thead|tbody|tr|td|th|hr|br')
+BLOCK_RE = re.compile(fr'\s*(</?(?:{BLOCK_TAGS})\b[^>]*>|<!DOCTYPE[^>]*>)\s*', re.I)
+
+
+def minify_html(html):
+    parts = PRESERVE_RE.split(html)
+    out = []
+    # split yields text, preserved element, tag name, text, ...
+    for i in range(0, len(parts), 3):
+        text = COMMENT_RE.sub('', parts[i])
+        text = BLOCK_RE.sub(r'\1', SPACE_RE.sub(' ', text))
+        out.append(text)
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return ''.join(out).strip()
+
+
+def is_text(path):
+    return path.endswith(TEXT_EXTENSIONS)
+
+
+def write_atomic(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def compress_data(data, suffix):
+    if suffix == '.br':
+        return brotli.compress(data, quality=11)
+    # A fixed mtime keeps the archive identical for identical content.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def process_file(path, previous, minify=False, compress=True):
+    st = os.stat(path)
+    siblings = compress and all(os.path.exists(path + suffix) for suffix in SUFFIXES)
+    unchanged = previous and previous["size"] == st.st_size and previous["mtime"] == st.st_mtime_ns
+    if unchanged and (siblings or not compress) and (previous.get("minified") or not minify):
+        return previous, False, False
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    minified = False
+    if minify:
+        text = minify_html(data.decode()).encode()
+        if text != data:
+            write_atomic(path, text)
+            data = text
+            st = os.stat(path)
+            minified = True
+    digest = hashlib.sha256(data).hexdigest()
+    record = {"hash": digest, "size": st.st_size, "mtime": st.st_mtime_ns, "minified": minify}
+    compressed = compress and not (siblings and previous and previous["hash"] == digest)
+    if compressed:
+        for suffix in SUFFIXES:
+            write_atomic(path + suffix, compress_data(data, suffix))
+    return record, minified, compressed
+
+
+def process_outputs(paths, previous, minify_paths=(), compress=True, workers=8):
+    records = {}
+    stats = {"files": 0, "minified": 0, "compressed": 0, "skipped": 0}
+    tasks = [path for path in sorted(paths) if is_text(path) and os.path.isfile(path)]
+    minify_paths = set(minify_paths)
+    if not tasks:
+        return records, stats
+
+    def run(path):
+        return process_file(path, previous.get(path), path in minify_paths and path.endswith('.html'), compress)
+
+    # zlib and brotli release the GIL while compressing, so threads overlap.
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tasks)))) as pool:
+        for path, (record, minified, compressed) in zip(tasks, pool.map(run, tasks)):
+            records[path] = record
+            stats["files"] += 1
+            stats["minified"] += minified
+            stats["compressed"] += compressed
+            stats["skipped"] += not (minified or compressed)
+    return records, stats
+
+
+def siblings(paths):
+    return [path + suffix for path in paths for suffix in ('.gz', '.br')]
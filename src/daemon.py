@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import random
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import threading
+import time
+
+import fragments
+import helper_functions
+
+
+SOCKET_PATH = '.build/render.sock'
+HEADER = struct.Struct('>I')
+# Larger frames are refused rather than buffered.
+MAX_FRAME = 64 << 20
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class SocketInUseError(Exception):
+    pass
+
+
+def remove_stale_socket(path):
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise SocketInUseError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        # Left behind by a daemon that did not shut down cleanly.
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise SocketInUseError(f"A daemon is already listening on {path}")
+
+
+def read_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            if chunks:
+                raise ProtocolError("Connection closed inside a frame")
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frame(sock):
+    header = read_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    size, = HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ProtocolError(f"Frame of {size} bytes is over the {MAX_FRAME} byte limit")
+    payload = read_exact(sock, size)
+    if payload is None:
+        raise ProtocolError("Connection closed inside a frame")
+    return json.loads(payload)
+
+
+def write_frame(sock, message):
+    payload = json.dumps(message).encode()
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+class RenderHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = read_frame(self.request)
+            except (ProtocolError, ValueError) as e:
+                write_frame(self.request, {"error": f"{type(e).__name__}: {e}"})
+                return
+            if request is None:
+                return
+            write_frame(self.request, self.server.render(request))
+
+
+class RenderServerMixin:
+    daemon_threads = True
+
+    def setup_renderer(self, template_path, cache_chars):
+        self.template_path = template_path
+        self.cache = fragments.FragmentCache(max_chars=cache_chars)
+        # Requests are read and answered concurrently, but the parser keeps
+        # module-level state (fragment cache, link collection) and holds the
+        # GIL while it works, so renders take turns.
+        self.lock = threading.Lock()
+        self.served = 0
+
+    def render(self, request):
+        if not isinstance(request, dict) or not isinstance(request.get("markdown"), str):
+            return {"error": "Request needs a markdown string"}
+        try:
+            with self.lock:
+                previous = fragments.active()
+                fragments.enable(self.cache)
+                try:
+                    if request.get("fragment"):
+                        html = helper_functions.markdown_to_html_node(request["markdown"]).to_html()
+                    else:
+                        html = helper_functions.render_page(request["markdown"], self.template_path)
+                finally:
+                    fragments.enable(previous)
+                self.served += 1
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+        return {"html": html}
+
+
+class UnixRenderServer(RenderServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+class TCPRenderServer(RenderServerMixin, socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+def make_server(address, template_path='template.html', cache_chars=16 << 20):
+    if isinstance(address, str):
+        folder = os.path.dirname(address)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        remove_stale_socket(address)
+        server = UnixRenderServer(address, RenderHandler)
+    else:
+        server = TCPRenderServer(address, RenderHandler)
+    server.setup_renderer(template_path, cache_chars)
+    # Load the template and compile the parser's patterns before the first request.
+    server.render({"markdown": "# Warm up\n\nA **b** _c_ `d` [e](/f)\n\n- g\n\n1. h\n\n> i"})
+    server.served = 0
+    return server
+
+
+def serve(address, template_path='template.html'):
+    server = make_server(address, template_path)
+    where = address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+    print(f"Rendering {template_path} pages on {where}, Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)
+    return server.served
+
+
+class Client:
+    def __init__(self, address, timeout=None):
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def render(self, markdown, fragment=False):
+        write_frame(self.sock, {"markdown": markdown, "fragment": fragment})
+        response = read_frame(self.sock)
+        if response is None:
+            raise ProtocolError("Daemon closed the connection")
+        if "error" in response:
+            raise Exception(response["error"])
+        return response["html"]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def percentile(values, fraction):
+    ranked = sorted(values)
+    return ranked[min(len(ranked) - 1, int(fraction * len(ranked)))]
+
+
+def bench(address, docs, requests=1000, concurrency=4):
+    latencies = [[] for _ in range(concurrency)]
+    errors = []
+
+    def worker(slot):
+        with Client(address) as client:
+            for i in range(slot, requests, concurrency):
+                start = time.perf_counter()
+                try:
+                    client.render(docs[i % len(docs)])
+                except Exception as e:
+                    errors.append(str(e))
+                latencies[slot].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    flat = [latency for slot in latencies for latency in slot]
+    return {
+        "requests": len(flat),
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "seconds": seconds,
+        "requests_per_s": len(flat) / seconds,
+        "p50_ms": percentile(flat, 0.5) * 1000,
+        "p99_ms": percentile(flat, 0.99) * 1000,
+    }
+
+
+def format_bench(report):
+    return (f"{report['requests']} requests, concurrency {report['concurrency']}, {report['errors']} errors\n"
+            f"  {report['requests_per_s']:10.1f} requests/s\n"
+            f"  {report['p50_ms']:10.2f} ms p50\n"
+            f"  {report['p99_ms']:10.2f} ms p99")
+
+
+def address_arg(args):
+    if args.port is not None:
+        return (args.host, args.port)
+    return args.socket
+
+
+def main(argv=None):
+    import benchmark
+    parser = argparse.ArgumentParser(description="Benchmark a running render daemon")
+    parser.add_argument('--socket', default=SOCKET_PATH, help="Unix socket of the daemon")
+    parser.add_argument('--port', type=int, help="talk to the daemon over TCP on this port instead")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--requests', '-n', type=int, default=1000)
+    parser.add_argument('--concurrency', '-c', type=int, default=4)
+    parser.add_argument('--shape', choices=benchmark.SHAPES, default='mixed')
+    parser.add_argument('--docs', type=int, default=50, help="number of distinct pages to send")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    docs = [benchmark.page(rng, args.shape, rng.randint(5, 30)) for _ in range(args.docs)]
+    report = bench(address_arg(args), docs, args.requests, args.concurrency)
+    print(json.dumps(report, indent=1, sort_keys=True) if args.json else format_bench(report))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
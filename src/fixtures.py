@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+
+class TempTree:
+    # Mixed into a TestCase: a scratch folder in self.root and write() to fill it.
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, path, data):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb' if isinstance(data, bytes) else 'w') as fh:
+            fh.write(data)
+        return path
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+
+import jsonfile
+
+
+FRAGMENTS_PATH = '.build/fragments.json'
+# Blocks larger than this are rarely repeated and would flush the cache.
+MAX_BLOCK = 1 << 16
+
+_active = None
+
+
+class FragmentCache:
+    def __init__(self, max_chars=16 << 20, path=None, version=''):
+        self.max_chars = max_chars
+        self.path = path
+        self.version = version
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.journal = None
+
+    def get(self, block):
+        entry = self.entries.get(block)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(block)
+        self.hits += 1
+        return entry
+
+    def put(self, block, html, refs):
+        if len(block) > MAX_BLOCK or block in self.entries:
+            return
+        self.entries[block] = (html, refs)
+        if self.journal is not None:
+            self.journal.append((block, html, refs))
+        self.size += len(block) + len(html or '')
+        while self.size > self.max_chars and self.entries:
+            evicted, (evicted_html, _) = self.entries.popitem(last=False)
+            self.size -= len(evicted) + len(evicted_html or '')
+
+    def load(self):
+        if not self.path:
+            return 0
+        data = jsonfile.read_json(self.path)
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return 0
+        for block, html, refs in data["entries"]:
+            self.put(block, html, [tuple(ref) for ref in refs])
+        return len(self.entries)
+
+    def save(self):
+        if not self.path:
+            return
+        jsonfile.write_json_atomic(self.path, {"version": self.version,
+                                      "entries": [[block, html, refs] for block, (html, refs) in self.entries.items()]},
+                          indent=None, sort_keys=False)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+def enable(cache):
+    global _active
+    _active = cache
+    return cache
+
+
+def disable():
+    enable(None)
+
+
+def active():
+    return _active
+
+
+class recording:
+    # Notes what a page adds to the active cache, so a worker process can
+    # hand its new blocks and counters back to the parent.
+    def __enter__(self):
+        self.cache = _active
+        self.delta = None
+        if self.cache is not None:
+            self.start = (self.cache.hits, self.cache.misses)
+            self.cache.journal = []
+        return self
+
+    def __exit__(self, *exc):
+        if self.cache is not None:
+            self.delta = (self.cache.journal, self.cache.hits - self.start[0], self.cache.misses - self.start[1])
+            self.cache.journal = None
+
+
+def merge(delta):
+    if _active is None or delta is None:
+        return
+    entries, hits, misses = delta
+    for block, html, refs in entries:
+        _active.put(block, html, refs)
+    _active.hits += hits
+    _active.misses += misses
@@ -1,8 +1,19 @@
+import io
+from contextlib import nullcontext
 import os
 from os.path import isfile
-import re
 from textnode import TextNode, TextType
 from htmlnode import LeafNode, ParentNode
+import assets
+import fragments
+import htmlnode
+import images
+import links
+import parse_cache
+import patterns
+import profiling
+import site_index
+import templates
 
 from enum import Enum
 
@@ -17,6 +28,8 @@ class BlockType(Enum):
 
 
 class BlockNode:
+    __slots__ = ('text', 'block_type', 'level')
+
     def __init__(self, text, block_type, level=None):
         self.text = text
         self.block_type = block_type
@@ -26,9 +39,9 @@ class BlockNode:
         return f"BlockNode({self.text}, {self.block_type.value}, {self.level})"
 
     def __eq__(self, other):
-        if self.__repr__() == other.__repr__():
-            return True
-        return False
+        if not isinstance(other, BlockNode):
+            return NotImplemented
+        return self.text == other.text and self.block_type == other.block_type and self.level == other.level
 
 def text_node_to_html_node(text_node):
     if not isinstance(text_node, TextNode):
@@ -46,9 +59,14 @@ def text_node_to_html_node(text_node):
         case "CODE":
             return LeafNode('code', text_node.text)
         case "LINK":
+            links.record("link", text_node.url)
             return LeafNode('a', text_node.text, props={"href": text_node.url})
         case "IMAGE":
-            return LeafNode('img', '', props={"src": text_node.url, "alt": text_node.text})
+            links.record("image", text_node.url)
+            src = assets.asset_url(text_node.url)
+            props = {"src": src, "alt": text_node.text}
+            props.update(images.attributes(text_node.url, src))
+            return LeafNode('img', '', props=props)
         case _:
             raise Exception("This shouldn't happen")
 
@@ -74,7 +92,7 @@ def split_nodes_regex(old_nodes, prefix=""):
     nodes = []
     for old_node in old_nodes:
         if old_node.text_type == TextType.TEXT:
-            for i, text in enumerate(re.split(fr'(?<!!)({prefix}\[.+?\]\(.*?\))', old_node.text)):
+            for i, text in enumerate(patterns.link_split(prefix).split(old_node.text)):
                 if not text:
                     continue
                 if i % 2 == 0:
@@ -97,7 +115,7 @@ def split_nodes_link(old_nodes):
     return split_nodes_regex(old_nodes)
 
 def handle_link_img_regex(text, prefix=""):
-    return re.findall(fr'(?:^| ){prefix}\[(.+?)\]\((.+?)\)', text)
+    return patterns.link_extract(prefix).findall(text)
 
 def extract_markdown_images(text):
     return handle_link_img_regex(text, prefix="!")
@@ -105,41 +123,120 @@ def extract_markdown_images(text):
 def extract_markdown_links(text):
     return handle_link_img_regex(text)
 
+def _append_images(nodes, text):
+    pos = 0
+    for match in patterns.INLINE_IMAGE.finditer(text):
+        if match.start() > pos:
+            nodes.append(TextNode(text[pos:match.start()], TextType.TEXT))
+        if match.group(2):
+            nodes.append(TextNode(match.group(1), TextType.IMAGE, match.group(2)))
+        else:
+            items = extract_markdown_images(match.group(0))
+            nodes.append(TextNode(items[0][0], TextType.IMAGE, items[0][1]))
+        pos = match.end()
+    if pos < len(text):
+        nodes.append(TextNode(text[pos:], TextType.TEXT))
+
+def _append_text(nodes, text):
+    if '[' not in text:
+        nodes.append(TextNode(text, TextType.TEXT))
+        return
+    pos = 0
+    for match in patterns.INLINE_LINK.finditer(text):
+        if match.start() > pos:
+            _append_images(nodes, text[pos:match.start()])
+        if match.group(2):
+            nodes.append(TextNode(match.group(1), TextType.LINK, match.group(2)))
+        else:
+            items = extract_markdown_links(match.group(0))
+            nodes.append(TextNode(items[0][0], TextType.LINK, items[0][1]))
+        pos = match.end()
+    if pos < len(text):
+        _append_images(nodes, text[pos:])
+
+def _append_piece(nodes, text, bold, italic, code):
+    if not text:
+        return
+    if bold:
+        nodes.append(TextNode(text, TextType.BOLD))
+    elif italic:
+        nodes.append(TextNode(text, TextType.ITALIC))
+    elif code:
+        nodes.append(TextNode(text.strip(), TextType.CODE))
+    else:
+        _append_text(nodes, text)
+
 def text_to_textnodes(text):
-    nodes = split_nodes_delimiter([TextNode(text, TextType.TEXT)], "**", TextType.BOLD) 
-    #nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC) 
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC) 
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_link(nodes)
-    nodes = split_nodes_image(nodes)
+    # One left-to-right walk equivalent to splitting on "**", then "_", then
+    # "`", then links, then images: a delimiter is only significant outside
+    # the spans opened by the delimiters split before it.
+    nodes = []
+    bold = italic = code = False
+    start = 0
+    for match in patterns.INLINE_DELIMITER.finditer(text):
+        delimiter = match.group()
+        if delimiter == '**':
+            _append_piece(nodes, text[start:match.start()], bold, italic, code)
+            bold, italic, code = not bold, False, False
+        elif bold:
+            continue
+        elif delimiter == '_':
+            _append_piece(nodes, text[start:match.start()], bold, italic, code)
+            italic, code = not italic, False
+        elif italic:
+            continue
+        else:
+            _append_piece(nodes, text[start:match.start()], bold, italic, code)
+            code = not code
+        start = match.end()
+    _append_piece(nodes, text[start:], bold, italic, code)
     return nodes
 
 def markdown_to_blocks(markdown):
-    blocks = re.split(r'\s*\n\n+\s*', markdown.strip())
+    if '```' in markdown:
+        return list(iter_markdown_blocks(io.StringIO(markdown)))
+    blocks = patterns.BLOCK_SPLIT.split(markdown.strip())
     return blocks
 
+def iter_markdown_blocks(lines):
+    # Same blocks as splitting on blank lines, except that blank lines inside
+    # a ``` fence stay part of the code block.
+    block = []
+    fenced = False
+    for line in lines:
+        if line.startswith('```') and line.count('```') % 2:
+            fenced = not fenced
+        if line == '\n' and not fenced and block:
+            text = ''.join(block).strip()
+            block = []
+            if text:
+                yield text
+            continue
+        block.append(line)
+    text = ''.join(block).strip()
+    if text:
+        yield text
+
 def block_to_block_type(block):
-    def check_type(cur_block_type, prev_block_type):
-        if prev_block_type in (None, cur_block_type):
-            return True
-        return False
     block_type = None
     start = None
     lines = block.split('\n')
     if block.startswith("`") and block.endswith("`"):
         lines = []
         block_type = BlockType.code
-    if len(lines) == 1 and (match := re.match(r'(^#+)(?: )', lines[0])):
+    if len(lines) == 1 and (match := patterns.HEADING.match(lines[0])):
         return BlockNode(lines[0][match.end():], BlockType.heading, level=len(match.group(1)))
     for line in lines:
-        if line[0] == '>' and check_type(BlockType.quote, block_type):
+        match = patterns.LINE_KIND.match(line)
+        kind = match.lastindex if match else None
+        if kind == patterns.LINE_QUOTE and block_type in (None, BlockType.quote):
             block_type = BlockType.quote
-        elif line[:2] in ("* ", "- ") and check_type(BlockType.unordered_list, block_type):
+        elif kind == patterns.LINE_UNORDERED and block_type in (None, BlockType.unordered_list):
             block_type = BlockType.unordered_list
-        elif (s := re.match(r'^(\d+)\. ', line)) and check_type(BlockType.ordered_list, block_type):
+        elif kind == patterns.LINE_ORDERED and block_type in (None, BlockType.ordered_list):
             if start == None:
                 start = 0
-            if int(s.groups()[0]) == start + 1:
+            if int(match.group(3)) == start + 1:
                 start += 1
                 block_type = BlockType.ordered_list
             else:
@@ -151,76 +248,337 @@ def block_to_block_type(block):
     return BlockNode(block, block_type, level=start)
 
 def text_to_children(text, tag):
-    nodes = text_to_textnodes(text)
-    htmlnodes = []
-    for node in nodes:
-         htmlnodes.append(text_node_to_html_node(node))
+    with profiling.stage('inline'):
+        nodes = text_to_textnodes(text)
+        htmlnodes = []
+        for node in nodes:
+             htmlnodes.append(text_node_to_html_node(node))
     if len(htmlnodes) == 1:
         htmlnodes[0].tag = tag
         return htmlnodes[0]
     return ParentNode(tag, htmlnodes)
 
-def markdown_to_html_node(markdown):
-    html_nodes = []
-    for markdown_block in markdown_to_blocks(markdown):
+def block_to_html_node(markdown_block):
+    with profiling.stage('block_to_block_type'):
         markdown_node = block_to_block_type(markdown_block)
-        match markdown_node.block_type:
-            case markdown_node.block_type.heading:
-                html_nodes.append(text_to_children(markdown_node.text, f"h{markdown_node.level}"))
-            case markdown_node.block_type.paragraph:
-                if re.match(r'^!?\[.+?\]\(.+?\)$', markdown_node.text.strip()):
+    match markdown_node.block_type:
+        case markdown_node.block_type.heading:
+            return text_to_children(markdown_node.text, f"h{markdown_node.level}")
+        case markdown_node.block_type.paragraph:
+            if patterns.IMAGE_PARAGRAPH.match(markdown_node.text.strip()):
+                with profiling.stage('inline'):
                     tn = text_to_textnodes(markdown_node.text)
-                    html_nodes.append(text_node_to_html_node(tn[0]))
-                else:
-                    html_nodes.append(text_to_children(markdown_node.text, "p"))
-            case markdown_node.block_type.unordered_list:
-                li = lambda txt: text_to_children(txt[2:], 'li')
-                ul = ParentNode('ul', list(map(li, markdown_node.text.split('\n'))))
-                html_nodes.append(ul)
-            case markdown_node.block_type.ordered_list:
-                li = lambda txt: text_to_children(txt[txt.find(" ") + 1:], 'li')
-                ol = ParentNode('ol', list(map(li, markdown_node.text.split('\n'))))
-                html_nodes.append(ol)
-            case markdown_node.block_type.code:
-                html_nodes.append(text_to_children(markdown_node.text, "code"))
-            case markdown_node.block_type.quote:
-                text = '\n'.join([ i[(2 if i.startswith('> ') else 1):] for i in markdown_node.text.split('\n') ])
-                html_nodes.append(text_to_children(text, "blockquote"))
-            case _:
-                print('what is this', markdown_node.block_type)
+                    return text_node_to_html_node(tn[0])
+            return text_to_children(markdown_node.text, "p")
+        case markdown_node.block_type.unordered_list:
+            li = lambda txt: text_to_children(txt[2:], 'li')
+            return ParentNode('ul', list(map(li, markdown_node.text.split('\n'))))
+        case markdown_node.block_type.ordered_list:
+            li = lambda txt: text_to_children(txt[txt.find(" ") + 1:], 'li')
+            return ParentNode('ol', list(map(li, markdown_node.text.split('\n'))))
+        case markdown_node.block_type.code:
+            return text_to_children(markdown_node.text, "code")
+        case markdown_node.block_type.quote:
+            text = '\n'.join([ i[(2 if i.startswith('> ') else 1):] for i in markdown_node.text.split('\n') ])
+            return text_to_children(text, "blockquote")
+        case _:
+            print('what is this', markdown_node.block_type)
+
+def render_block(markdown_block):
+    cache = fragments.active()
+    if cache is None:
+        return block_to_html_node(markdown_block)
+    entry = cache.get(markdown_block)
+    if entry is None:
+        with links.collecting() as refs:
+            html_node = block_to_html_node(markdown_block)
+        html = None
+        if html_node is not None:
+            with profiling.stage('to_html'):
+                html = html_node.to_html()
+        entry = (html, refs)
+        cache.put(markdown_block, html, refs)
+    links.record_all(entry[1])
+    # A tagless leaf serializes its value as is.
+    return None if entry[0] is None else LeafNode(None, entry[0])
+
+def markdown_to_html_node(markdown):
+    html_nodes = []
+    with profiling.stage('markdown_to_blocks'):
+        markdown_blocks = markdown_to_blocks(markdown)
+    for markdown_block in markdown_blocks:
+        html_node = render_block(markdown_block)
+        if html_node is not None:
+            html_nodes.append(html_node)
     return ParentNode('div', html_nodes)
 
+
+class StreamedMarkdown:
+    # Stands in for the ParentNode('div') of a whole document: blocks are read,
+    # converted and serialized one at a time while the template is written.
+    def __init__(self, lines):
+        self.lines = lines
+
+    def iter_html(self):
+        yield '<div>'
+        empty = True
+        for markdown_block in iter_markdown_blocks(self.lines):
+            html_node = render_block(markdown_block)
+            if html_node is not None:
+                empty = False
+                yield from html_node.iter_html()
+        if empty:
+            raise ValueError("Must have children")
+        yield '</div>'
+
+    def write_html(self, fp):
+        fp.writelines(self.iter_html())
+
+def render_markdown(markdown):
+    cache = parse_cache.active()
+    if cache is None:
+        return markdown_to_html_node(markdown)
+    entry = cache.get(markdown)
+    if entry is None:
+        # References are cached with the HTML so a hit still reports them.
+        with links.collecting() as refs:
+            node = markdown_to_html_node(markdown)
+        with profiling.stage('to_html'):
+            html = node.to_html()
+        entry = {"html": html, "refs": refs}
+        cache.put(markdown, entry)
+    links.record_all(entry["refs"])
+    return entry["html"]
+
 def extract_title(markdown):
     for line in markdown.split('\n'):
         if line.startswith('# '):
             return line[2:].strip()
     raise Exception("No H1 header Found")
 
+def extract_metadata(markdown):
+    metadata = {}
+    if not markdown.startswith('---\n'):
+        return metadata, markdown
+    end = markdown.find('\n---\n', 3)
+    if end == -1:
+        return metadata, markdown
+    for line in markdown[4:end].split('\n'):
+        key, sep, value = line.partition(':')
+        if sep and key.strip():
+            metadata[key.strip()] = value.strip()
+    return metadata, markdown[end + 5:]
+
+def read_front_matter(fh):
+    # Line-based extract_metadata: leaves fh positioned at the start of the body.
+    start = fh.tell()
+    if fh.readline() != '---\n':
+        fh.seek(start)
+        return {}
+    lines = []
+    for line in iter(fh.readline, ''):
+        if line == '---\n':
+            return extract_metadata('---\n' + ''.join(lines) + '---\n')[0]
+        lines.append(line)
+    fh.seek(start)
+    return {}
+
+def extract_title_lines(lines):
+    for line in lines:
+        if line.startswith('# '):
+            return line[2:].strip()
+    raise Exception("No H1 header Found")
+
+def extract_summary(markdown):
+    for block in markdown_to_blocks(markdown):
+        node = block_to_block_type(block)
+        if node.block_type == BlockType.paragraph and not patterns.IMAGE_PARAGRAPH.match(node.text.strip()):
+            words = "".join(tn.text for tn in text_to_textnodes(node.text) if tn.text_type != TextType.IMAGE)
+            return " ".join(words.split())
+    return ""
+
+def record_page(title, markdown):
+    if site_index.wanted():
+        site_index.record(title, extract_summary(markdown), site_index.tokenize(markdown))
+
 def make_content_subfolders(file):
     dirs = file[:file.rfind("/")]
     if not os.path.exists(dirs):
-        os.makedirs(dirs)
+        os.makedirs(dirs, exist_ok=True)
+
+def prepare_page(markdown, template_path):
+    # Template and metadata for a page, with its Content rendered but not yet serialized.
+    with profiling.stage('template'):
+        page_template = templates.load_template(template_path)
+        metadata, markdown = extract_metadata(markdown)
+        if "Title" not in metadata:
+            metadata["Title"] = extract_title(markdown)
+    record_page(metadata["Title"], markdown)
+    metadata["Content"] = render_markdown(markdown)
+    return page_template, metadata
+
+def render_page(markdown, template_path):
+    page_template, metadata = prepare_page(markdown, template_path)
+    with profiling.stage('template'):
+        return page_template.render(metadata)
 
-def generate_page(from_path, template_path, dest_path):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+STREAM_THRESHOLD = 16 << 20
+
+def generate_page_streaming(from_path, template_path, dest_path):
+    page_template = templates.load_template(template_path)
     with open(from_path) as fh:
-        markdown = ''.join(fh.readlines())
-    with open(template_path) as fh:
-        template = ''.join(fh.readlines())
-    outfile = template.replace("{{ Title }}", extract_title(markdown))
-    outfile = outfile.replace("{{ Content }}", markdown_to_html_node(markdown).to_html())
+        metadata = read_front_matter(fh)
+        if "Title" not in metadata:
+            metadata["Title"] = extract_title_lines(fh)
+    # Too large to hold in memory for a summary and token list.
+    site_index.record(metadata["Title"], "", [])
     make_content_subfolders(dest_path)
-    with open(dest_path, 'w+') as fh:
-        fh.write(outfile)
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
-    for item in os.listdir(dir_path_content):
-        current = f'{dir_path_content}/{item}'
-        dest = f'{dest_dir_path}/{item}'
-        if os.path.isfile(current):
-            print(current, template_path, dest_dir_path)
-            generate_page(current, template_path, dest.replace('.md', '.html'))
-        else:
-            print(current, template_path, dest)
-            generate_pages_recursive(current, template_path, dest)
+    tmp_path = f"{dest_path}.tmp"
+    try:
+        with open(from_path) as src, open(tmp_path, 'w') as fh:
+            read_front_matter(src)
+            metadata["Content"] = StreamedMarkdown(src)
+            page_template.write(fh, metadata)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dest_path)
+
+def generate_page(from_path, template_path, dest_path, quiet=False):
+    if not quiet:
+        print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    if os.path.getsize(from_path) > STREAM_THRESHOLD:
+        return generate_page_streaming(from_path, template_path, dest_path)
+    with profiling.stage('read'):
+        with open(from_path) as fh:
+            markdown = ''.join(fh.readlines())
+    page_template, metadata = prepare_page(markdown, template_path)
+    rendered = None
+    if profiling.enabled:
+        # Render up front so serialization and template fill are timed
+        # separately from the write.
+        if not isinstance(metadata["Content"], str):
+            with profiling.stage('to_html'):
+                metadata["Content"] = metadata["Content"].to_html()
+        with profiling.stage('template'):
+            rendered = page_template.render(metadata)
+    make_content_subfolders(dest_path)
+    tmp_path = f"{dest_path}.tmp"
+    try:
+        with profiling.stage('write'), open(tmp_path, 'w') as fh:
+            if rendered is None:
+                page_template.write(fh, metadata)
+            else:
+                fh.write(rendered)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dest_path)
+
+
+class PageBuildError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("\n".join(f"{path}: {error}" for path, error in errors))
+
+
+def discover_pages(dir_path_content, dest_dir_path):
+    import build_plan
+    return [(entry.source, entry.dest) for entry in build_plan.scan(dir_path_content, dest_dir_path, build_plan.PAGE)]
 
+def worker_state():
+    # Spawned and forkserver workers start from freshly imported modules, so
+    # the build's switches are handed over instead of inherited through fork.
+    return (assets._mapping, assets._version, images._images, images._version, parse_cache.active(),
+            fragments.active(), profiling.enabled, htmlnode.validate)
+
+def init_worker(state):
+    (assets._mapping, assets._version, images._images, images._version, cache, fragment_cache,
+     enabled, htmlnode.validate) = state
+    parse_cache.enable(cache)
+    fragments.enable(fragment_cache)
+    if enabled:
+        profiling.enable()
+
+def _render_page(task):
+    from_path, template_path, dest_path, collect, share = task
+    profiling.begin_page()
+    with links.collecting() as refs, (site_index.collecting() if collect else nullcontext([])) as info, \
+            (fragments.recording() if share else nullcontext()) as recorded:
+        try:
+            generate_page(from_path, template_path, dest_path, quiet=True)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}", profiling.end_page(), refs, None
+    return None, profiling.end_page(), refs, (info[0] if info else None, recorded.delta if share else None)
+
+def generate_pages(pages, template_path, jobs=1, references=None, io_concurrency=0, sizes=None, page_info=None):
+    if io_concurrency > 0:
+        import async_build
+        return async_build.run(pages, template_path, jobs, io_concurrency, references=references, page_info=page_info)
+    collect = page_info is not None
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    # Worker processes send their new fragments back; in process the cache is shared.
+    share = jobs > 1 and len(pages) > 1
+    tasks = [(from_path, template_path, dest_path, collect, share) for from_path, dest_path in pages]
+    if share:
+        from concurrent.futures import ProcessPoolExecutor
+        if sizes:
+            # Largest pages first so one big page does not finish last on its own.
+            tasks.sort(key=lambda task: -sizes.get(task[0], 0))
+        pool = ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), initializer=init_worker,
+                                   initargs=(worker_state(),))
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        results = pool.map(_render_page, tasks, chunksize=chunksize)
+    else:
+        pool = None
+        results = map(_render_page, tasks)
+    errors = []
+    profiler = profiling.active()
+    try:
+        for done, ((from_path, template_path, dest_path, _, _), (error, stages, refs, extra)) in enumerate(zip(tasks, results), 1):
+            profiling.page_done(done, len(tasks), f"Generating page from {from_path} to {dest_path} using {template_path}")
+            info, delta = extra or (None, None)
+            fragments.merge(delta)
+            if profiler and stages:
+                profiler.add_page(from_path, stages)
+            if references is not None and not error:
+                references[dest_path] = refs
+            if info is not None:
+                page_info[dest_path] = info
+            if error:
+                print(f"Failed to generate {from_path}: {error}")
+                errors.append((from_path, error))
+    finally:
+        if pool:
+            pool.shutdown()
+    if sizes:
+        order = {from_path: i for i, (from_path, _) in enumerate(pages)}
+        errors.sort(key=lambda error: order[error[0]])
+    return errors
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, jobs=1):
+    errors = generate_pages(discover_pages(dir_path_content, dest_dir_path), template_path, jobs)
+    if errors:
+        raise PageBuildError(errors)
+
+def generate_pages_incremental(dir_path_content, template_path, dest_dir_path, old, new, force=False, jobs=1, references=None, io_concurrency=0, plan=None, outputs=None, page_info=None):
+    import build_plan
+    import manifest
+    if plan is None:
+        plan = build_plan.scan(dir_path_content, dest_dir_path, build_plan.PAGE)
+    pending = []
+    sizes = {}
+    for entry in plan:
+        digest = manifest.page_hash(old["pages"], entry)
+        new["pages"][entry.source] = {"hash": digest, "dest": entry.dest, "size": entry.size, "mtime": entry.mtime}
+        if force or manifest.is_changed(old["pages"], entry.source, digest, entry.dest, outputs):
+            pending.append((entry.source, entry.dest))
+            sizes[entry.source] = entry.size
+    errors = generate_pages(pending, template_path, jobs, references, io_concurrency, sizes, page_info)
+    for current, _ in errors:
+        if current in old["pages"]:
+            new["pages"][current] = old["pages"][current]
+        else:
+            del new["pages"][current]
+    return errors
@@ -1,10 +1,18 @@
 
+# Type checks on every node are useful while developing the parser but cost
+# four isinstance calls per node; builds switch them off.
+validate = True
+
+
 class HTMLNode():
+    __slots__ = ('tag', 'value', 'children', 'props')
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        assert isinstance(tag, (type(None), str))
-        assert isinstance(value, (type(None), str))
-        assert isinstance(children, (type(None), list))
-        assert isinstance(props, (type(None), dict))
+        if validate:
+            assert isinstance(tag, (type(None), str))
+            assert isinstance(value, (type(None), str))
+            assert isinstance(children, (type(None), list))
+            assert isinstance(props, (type(None), dict))
         self.tag = tag
         self.value = value
         self.children = children
@@ -13,21 +21,75 @@ class HTMLNode():
     def to_html(self):
         raise NotImplementedError("Used in child types")
 
+    def iter_html(self):
+        yield self.to_html()
+
+    def write_html(self, fp):
+        fp.writelines(self.iter_html())
+
     def props_to_html(self):
         if not isinstance(self.props, dict):
             raise Exception("props not set")
         return " " + " ".join([f'{k}="{v}"' for k, v in self.props.items()])
 
     def __repr__(self):
-        return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
+        # Children are walked from an explicit stack so deep trees neither
+        # hit the recursion limit nor pay for a frame per level. Every item
+        # is followed by ", " and the last one is dropped when a list closes.
+        out = []
+        stack = [(None, iter((self,)))]
+        while stack:
+            for item in stack[-1][1]:
+                if not isinstance(item, HTMLNode):
+                    out.append(repr(item))
+                elif item.children is None:
+                    out.append(f"HTMLNode({item.tag}, {item.value}, None, {item.props})")
+                else:
+                    out.append(f"HTMLNode({item.tag}, {item.value}, [")
+                    stack.append((item, iter(item.children)))
+                    break
+                out.append(", ")
+            else:
+                node = stack.pop()[0]
+                if out[-1] == ", ":
+                    out.pop()
+                if node is not None:
+                    out.append(f"], {node.props})")
+                    out.append(", ")
+        return "".join(out)
 
     def __eq__(self, other):
-        if self.__repr__() == other.__repr__():
-            return True
-        return False
+        if not isinstance(other, HTMLNode):
+            return NotImplemented
+        # Pairs are compared depth first, left to right, like the nested list
+        # comparison this replaces, so a mismatch still ends the walk early.
+        stack = [iter(((self, other),))]
+        while stack:
+            for a, b in stack[-1]:
+                if a is b:
+                    continue
+                if not (isinstance(a, HTMLNode) and isinstance(b, HTMLNode)):
+                    if a != b:
+                        return False
+                    continue
+                if a.tag != b.tag or a.value != b.value or a.props != b.props:
+                    return False
+                if a.children is None or b.children is None:
+                    if a.children is not b.children:
+                        return False
+                elif len(a.children) != len(b.children):
+                    return False
+                elif a.children:
+                    stack.append(zip(a.children, b.children))
+                    break
+            else:
+                stack.pop()
+        return True
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, props=props)
 
@@ -43,23 +105,41 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, value=None, children=children, props=props)
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def open_tag(self):
         if not self.tag:
             raise ValueError("Must have a tag")
         if not self.children:
             raise ValueError("Must have children")
-        html = ""
-        for child in self.children:
-            if isinstance(child, str):
-                html += child
-                continue
-            html += child.to_html()
-        props_str = ""
         if self.props:
-            props_str += self.props_to_html()
-        return f"<{self.tag + props_str}>{html}</{self.tag}>"
-
+            return f"<{self.tag}{self.props_to_html()}>"
+        return f"<{self.tag}>"
 
+    def iter_html(self):
+        # One generator walks the whole tree; nested generators would cost a
+        # frame per level and re-yield every chunk through each ancestor.
+        yield self.open_tag()
+        stack = [(self.tag, iter(self.children))]
+        while stack:
+            tag, children = stack[-1]
+            for child in children:
+                if isinstance(child, str):
+                    yield child
+                elif isinstance(child, LeafNode):
+                    yield child.to_html()
+                elif isinstance(child, ParentNode):
+                    yield child.open_tag()
+                    stack.append((child.tag, iter(child.children)))
+                    break
+                else:
+                    yield from child.iter_html()
+            else:
+                stack.pop()
+                yield f"</{tag}>"
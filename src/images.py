@@ -0,0 +1,231 @@
+import hashlib
+import os
+import posixpath
+import re
+import struct
+
+import jsonfile
+
+
+IMAGES_PATH = '.build/images.json'
+CACHE_DIR = '.build/images'
+EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+WIDTHS = (480, 960)
+SUFFIX_RE = re.compile(r'[?#]')
+# JPEG start-of-frame markers carry the dimensions; C4, C8 and CC do not.
+JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+_images = {}
+_version = ''
+_pillow = False
+
+
+def pillow():
+    # Pillow is optional and slow to import, so it is only loaded for variants.
+    global _pillow
+    if _pillow is False:
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = None
+        _pillow = Image
+    return _pillow
+
+
+def read_dimensions(path):
+    # Truncated or corrupt files give None rather than failing the build.
+    try:
+        with open(path, 'rb') as fh:
+            return _read_dimensions(fh)
+    except (OSError, struct.error):
+        return None
+
+
+def _read_dimensions(fh):
+    head = fh.read(26)
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+        return struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', head[6:10])
+    if head[:2] != b'\xff\xd8':
+        return None
+    fh.seek(2)
+    while True:
+        marker = fh.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length = struct.unpack('>H', fh.read(2))[0]
+        if marker[1] in JPEG_SOF:
+            height, width = struct.unpack('>xHH', fh.read(5))
+            return width, height
+        fh.seek(length - 2, 1)
+
+
+def cache_file(cache_dir, digest, width, ext):
+    return f'{cache_dir}/{digest}-{width}{ext}'
+
+
+def process_image(task):
+    source, digest, cache_dir = task
+    dimensions = read_dimensions(source)
+    if dimensions is None:
+        return None
+    width, height = dimensions
+    variants = []
+    Image = pillow()
+    if Image is not None:
+        ext = os.path.splitext(source)[1].lower()
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with Image.open(source) as image:
+                fmt = image.format
+                for target in WIDTHS:
+                    if target >= width:
+                        break
+                    dest = cache_file(cache_dir, digest, target, ext)
+                    tmp = f'{dest}.{os.getpid()}.tmp'
+                    image.resize((target, max(1, round(height * target / width))), Image.LANCZOS).save(tmp, format=fmt)
+                    os.replace(tmp, dest)
+                    variants.append(target)
+        except Exception as e:
+            # Pillow could not decode it; keep the size and skip the variants.
+            print(f"warning: no variants for {source}: {type(e).__name__}: {e}")
+    return {"width": width, "height": height, "variants": variants}
+
+
+def variant_url(url, digest, width):
+    root, ext = posixpath.splitext(url)
+    return f'{root}-{width}w.{digest[:10]}{ext}'
+
+
+def new_state():
+    return {"images": {}, "urls": {}}
+
+
+def load_state(path=IMAGES_PATH):
+    state = jsonfile.read_json(path)
+    if not isinstance(state, dict) or "urls" not in state:
+        return new_state()
+    return state
+
+
+def save_state(state, path=IMAGES_PATH):
+    jsonfile.write_json_atomic(path, state)
+
+
+def process(static, public, previous, workers=1, link='reflink', cache_dir=CACHE_DIR):
+    import manifest
+    state = new_state()
+    digests = {}
+    for source, entry in sorted(static.items()):
+        if not source.lower().endswith(EXTENSIONS):
+            continue
+        url = entry["dest"][len(public):]
+        old = previous["urls"].get(url)
+        if old and old["size"] == entry["size"] and old["mtime"] == entry["mtime"]:
+            digests[url] = (source, old["hash"])
+        else:
+            digests[url] = (source, manifest.hash_file(source))
+
+    def cached(digest, info, ext):
+        return all(os.path.exists(cache_file(cache_dir, digest, width, ext)) for width in info["variants"])
+
+    tasks = {}
+    for url, (source, digest) in digests.items():
+        info = previous["images"].get(digest)
+        ext = os.path.splitext(source)[1].lower()
+        if info is not None and (info == {} or cached(digest, info, ext)):
+            state["images"][digest] = info
+        elif digest not in tasks:
+            tasks[digest] = (source, digest, cache_dir)
+    if tasks:
+        if workers is None or workers < 1:
+            workers = os.cpu_count() or 1
+        if workers > 1 and len(tasks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                results = list(pool.map(process_image, tasks.values()))
+        else:
+            results = [process_image(task) for task in tasks.values()]
+        for digest, info in zip(tasks, results):
+            # {} marks a file whose format we cannot read, so it is not retried.
+            state["images"][digest] = info or {}
+
+    import static_sync
+    changed = []
+    stale = []
+    for url, (source, digest) in digests.items():
+        info = state["images"][digest]
+        ext = os.path.splitext(source)[1].lower()
+        dests = []
+        for width in info.get("variants", ()):
+            dest = f'{public}{variant_url(url, digest, width)}'
+            if not os.path.exists(dest):
+                static_sync.sync_file(cache_file(cache_dir, digest, width, ext), dest, link)
+            dests.append(dest)
+        entry = static[source]
+        state["urls"][url] = {"hash": digest, "size": entry["size"], "mtime": entry["mtime"], "dests": dests}
+        old = previous["urls"].get(url)
+        if old is None or old["hash"] != digest:
+            changed.append(url)
+            if old:
+                stale.extend(dest for dest in old["dests"] if dest not in dests)
+    for url, old in previous["urls"].items():
+        if url not in state["urls"]:
+            changed.append(url)
+            stale.extend(old["dests"])
+    used = {record["hash"] for record in state["urls"].values()}
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.split('-', 1)[0] not in used:
+                os.remove(f'{cache_dir}/{name}')
+    return state, sorted(changed), sorted(stale)
+
+
+def drop_urls(previous):
+    # With the stage off only the published variants go; the per-hash cache
+    # stays so turning it back on reprocesses nothing.
+    state = {"images": dict(previous["images"]), "urls": {}}
+    stale = [dest for old in previous["urls"].values() for dest in old["dests"]]
+    return state, sorted(previous["urls"]), sorted(stale)
+
+
+def enable(state):
+    global _images, _version
+    _images = {}
+    for url, record in state["urls"].items():
+        info = state["images"].get(record["hash"])
+        if info:
+            _images[url] = (record["hash"], info)
+    h = hashlib.sha256()
+    for url, (digest, info) in sorted(_images.items()):
+        h.update(f'{url}\0{digest}\0{info["width"]}\0{info["height"]}\0{info["variants"]}\0'.encode())
+    _version = h.hexdigest()[:16]
+
+
+def disable():
+    global _images, _version
+    _images = {}
+    _version = ''
+
+
+def version():
+    return _version
+
+
+def attributes(url, src):
+    if not _images:
+        return {}
+    path = SUFFIX_RE.split(url, 1)[0]
+    found = _images.get(path)
+    if found is None:
+        return {}
+    digest, info = found
+    props = {"width": str(info["width"]), "height": str(info["height"])}
+    if info["variants"]:
+        candidates = [f'{variant_url(path, digest, width)} {width}w' for width in info["variants"]]
+        props["srcset"] = ", ".join(candidates + [f'{src} {info["width"]}w'])
+    props["loading"] = "lazy"
+    return props
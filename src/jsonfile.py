@@ -0,0 +1,21 @@
+import json
+import os
+
+
+def read_json(path, default=None):
+    # A missing or half-written state file just means starting over.
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json_atomic(path, data, indent=1, sort_keys=True):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(data, fh, indent=indent, sort_keys=sort_keys)
+    os.replace(tmp, path)
@@ -0,0 +1,140 @@
+import posixpath
+import re
+
+import jsonfile
+
+
+INDEX_PATH = '.build/links.json'
+EXTERNAL_RE = re.compile(r'^(?:[a-zA-Z][a-zA-Z0-9+.-]*:|//)')
+TEMPLATE_REF_RE = re.compile(r'(?:href|src)="([^"]+)"')
+
+_stack = []
+
+
+class collecting:
+    def __enter__(self):
+        self.refs = []
+        _stack.append(self.refs)
+        return self.refs
+
+    def __exit__(self, *exc):
+        _stack.pop()
+
+
+def record(kind, url):
+    if _stack:
+        _stack[-1].append((kind, url))
+
+
+def record_all(refs):
+    if _stack:
+        _stack[-1].extend((kind, url) for kind, url in refs)
+
+
+def page_url(dest, public):
+    url = dest[len(public):]
+    if url.endswith('/index.html'):
+        return url[:-len('index.html')]
+    return url
+
+
+def output_urls(dest, public):
+    url = dest[len(public):]
+    urls = {url}
+    if url.endswith('/index.html'):
+        folder = url[:-len('index.html')]
+        urls.update((folder, folder.rstrip('/') or '/'))
+    elif url.endswith('.html'):
+        urls.add(url[:-len('.html')])
+    return urls
+
+
+def resolve(url, base):
+    if not url or EXTERNAL_RE.match(url):
+        return None
+    url = url.split('#', 1)[0].split('?', 1)[0]
+    if not url:
+        return None
+    if not url.startswith('/'):
+        url = posixpath.join(base if base.endswith('/') else posixpath.dirname(base) + '/', url)
+    trailing = url.endswith('/')
+    url = posixpath.normpath(url)
+    if trailing and url != '/':
+        url += '/'
+    return url
+
+
+def page_entry(refs, dest, public):
+    base = page_url(dest, public)
+    entry = {"links": [], "images": []}
+    for kind, url in refs:
+        target = resolve(url, base)
+        if target is not None:
+            entry["images" if kind == "image" else "links"].append(target)
+    return entry
+
+
+def template_refs(template_path):
+    with open(template_path) as fh:
+        return [("link", url) for url in TEMPLATE_REF_RE.findall(fh.read())]
+
+
+def new_index():
+    return {"pages": {}, "template": {"links": [], "images": []}}
+
+
+def load_index(path=INDEX_PATH):
+    index = jsonfile.read_json(path)
+    if not isinstance(index, dict) or "pages" not in index:
+        return new_index()
+    return index
+
+
+def save_index(index, path=INDEX_PATH):
+    jsonfile.write_json_atomic(path, index)
+
+
+def references(index):
+    reverse = {}
+    entries = list(index["pages"].items()) + [("template", index["template"])]
+    for page, entry in entries:
+        for target in entry["links"] + entry["images"]:
+            reverse.setdefault(target, set()).add(page)
+    return reverse
+
+
+def affected_pages(index, urls):
+    reverse = references(index)
+    pages = set()
+    for url in urls:
+        for candidate in (url, url.rstrip('/'), url.rstrip('/') + '/'):
+            pages.update(reverse.get(candidate, ()))
+    pages.discard("template")
+    return sorted(pages)
+
+
+def broken_links(index, outputs, public):
+    known = set()
+    for dest in outputs:
+        known.update(output_urls(dest, public))
+    broken = []
+    for page, entry in sorted(index["pages"].items()):
+        for target in entry["links"] + entry["images"]:
+            if target not in known and target.rstrip('/') not in known:
+                broken.append((page, target))
+    return broken
+
+
+def unreferenced(index, static_outputs, public):
+    reverse = references(index)
+    return sorted(dest for dest in static_outputs if dest[len(public):] not in reverse)
+
+
+def update_index(index, page_refs, pages, public, template_path):
+    for dest, refs in page_refs.items():
+        index["pages"][dest] = page_entry(refs, dest, public)
+    for dest in list(index["pages"]):
+        if dest not in pages:
+            del index["pages"][dest]
+    index["template"] = page_entry(template_refs(template_path), f'{public}/index.html', public)
+    return index
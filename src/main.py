@@ -1,31 +1,384 @@
+import argparse
 import os
-import shutil
-import helper_functions
-
-
-def clean_public(folder=''):
-    src = 'static'
-    dst = 'public'
-    j = lambda directory: '/'.join(directory).replace('//', '/')
-    if folder == '':
-        if os.path.exists(dst):
-            shutil.rmtree(dst)
-        os.mkdir(dst)
+import sys
+import time
+
+
+COMMANDS = ('build', 'render-one', 'check', 'stats', 'daemon')
+# static_sync.MODES, spelled out so building the parser imports nothing heavy.
+LINK_MODES = ('copy', 'reflink', 'hardlink')
+# Seconds from interpreter start to a rendered page; `benchmark.py --startup` checks it.
+STARTUP_BUDGET = 0.25
+
+
+def clean_public(dst='public'):
+    import shutil
+    try:
+        shutil.rmtree(dst)
+    except FileNotFoundError:
+        pass
+    os.mkdir(dst)
+
+
+def build(full=False, jobs=1, cache=True, link='reflink', checksum=False, io_concurrency=0, minify=False, precompress=False, fingerprint=False, image_stage=False, site_url=None):
+    import assets
+    import build_plan
+    import compress
+    import fragments
+    import helper_functions
+    import images
+    import links
+    import manifest
+    import parse_cache
+    import profiling
+    import site_index
+    import static_sync
+    if cache:
+        parse_cache.enable(parse_cache.ParseCache())
+    template = 'template.html'
+    old = manifest.load_manifest()
+    index = links.load_index()
+    previous_assets = assets.load_assets()
+    previous_images = images.load_state()
+    store = site_index.load_store()
+    if full or not os.path.exists('public'):
+        old = manifest.new_manifest()
+        index = links.new_index()
+        previous_assets = {}
+        previous_images = images.new_state()
+        store = site_index.new_store()
+        clean_public()
+    new = manifest.new_manifest()
+    start = time.perf_counter()
+    plan = build_plan.make_plan('content', 'static', 'public')
+    outputs = build_plan.scan_outputs('public')
+    if profiling.active():
+        profiling.active().add_section('discover', time.perf_counter() - start, entries=len(plan) + len(outputs))
+    start = time.perf_counter()
+    new["static"], stats = static_sync.sync_tree('static', 'public', link, checksum,
+                                                 plan=build_plan.of_kind(plan, build_plan.STATIC), outputs=outputs)
+    if profiling.active():
+        profiling.active().add_section('static', time.perf_counter() - start, files=stats['files'],
+                                       synced=stats['synced'], bytes=stats['bytes'])
+    if profiling.output != 'quiet':
+        print(f"Synced {stats['synced']} of {stats['files']} static files ({stats['bytes']} bytes)")
+    template_hash = manifest.hash_file(template)
+    new["template"][template] = {"hash": template_hash}
+    force = old["template"].get(template, {}).get("hash") != template_hash
+    start = time.perf_counter()
+    records, changed_assets, stale_assets = assets.fingerprint(new["static"] if fingerprint else {}, 'public',
+                                                                previous_assets, link, outputs)
+    if fingerprint:
+        assets.enable(records)
+    if profiling.active() and fingerprint:
+        profiling.active().add_section('fingerprint', time.perf_counter() - start, assets=len(records), changed=len(changed_assets))
+    start = time.perf_counter()
+    if image_stage:
+        image_state, changed_images, stale_images = images.process(new["static"], 'public', previous_images, jobs, link)
+        images.enable(image_state)
     else:
-        os.mkdir(j([dst, folder]))
-    if not os.path.exists(src):
-        raise Exception(f'Where is {src}??')
-    for item in os.listdir(j([src, folder])):
-        if os.path.isfile(j([src, folder, item])):
-            shutil.copy(j([src, folder, item]), j([dst, folder, item]))
-        else:
-            clean_public(j([folder + item]))
+        image_state, changed_images, stale_images = images.drop_urls(previous_images)
+    if profiling.active() and image_stage:
+        profiling.active().add_section('images', time.perf_counter() - start, images=len(image_state["urls"]),
+                                       changed=len(changed_images))
+    changed_urls = changed_assets + changed_images
+    if changed_urls:
+        # Pages embed the hashed names and image sizes, so any page using a changed asset is re-rendered.
+        template_urls = set(index["template"]["links"] + index["template"]["images"])
+        force = force or bool(template_urls.intersection(changed_assets))
+        affected = set(links.affected_pages(index, changed_urls))
+        old["pages"] = {source: entry for source, entry in old["pages"].items() if entry["dest"] not in affected}
+    if cache:
+        version = f'{parse_cache.cache_version()}-{assets.version()}-{images.version()}'
+        fragments.enable(fragments.FragmentCache(path=fragments.FRAGMENTS_PATH, version=version)).load()
+    page_info = None
+    if site_url:
+        # Pages missing from the metadata store, or indexed from older source, are rendered again.
+        page_info = {}
+        old["pages"] = {source: entry for source, entry in old["pages"].items()
+                        if site_index.is_current(store, entry["dest"], entry["hash"])}
+    page_refs = {}
+    errors = helper_functions.generate_pages_incremental('content', template, 'public', old, new, force, jobs, page_refs, io_concurrency,
+                                                            build_plan.of_kind(plan, build_plan.PAGE), outputs, page_info)
+    site_outputs = []
+    if site_url:
+        pages = {entry["dest"]: {"source": source, "mtime": entry["mtime"], "hash": entry["hash"]}
+                 for source, entry in new["pages"].items()}
+        site_index.update_store(store, page_info, pages, 'public')
+        site_index.save_store(store)
+        site_outputs, written = site_index.emit(store, 'public', site_url)
+        if profiling.output != 'quiet':
+            print(f"Indexed {len(page_info)} changed of {len(store['pages'])} pages, rewrote {len(written)} site files")
+    else:
+        # Left behind, they would keep listing pages this build no longer indexes.
+        site_index.remove_outputs('public')
+    stale = manifest.stale_outputs(old, new)
+    links.update_index(index, page_refs, {entry["dest"] for entry in new["pages"].values()}, 'public', template)
+    removed = [url for dest in stale for url in links.output_urls(dest, 'public')]
+    if profiling.output != 'quiet':
+        for page in links.affected_pages(index, removed):
+            print(f"warning: {page} references a removed page or asset")
+    stale += stale_assets + stale_images
+    manifest.remove_outputs(sorted(stale + compress.siblings(stale)), 'public')
+    if not precompress:
+        # Siblings from an earlier --compress build would keep serving old pages.
+        manifest.remove_outputs(compress.siblings(sorted(old.get("compressed", {}))), 'public')
+    if minify or precompress:
+        start = time.perf_counter()
+        pages = [entry["dest"] for entry in new["pages"].values()]
+        targets = pages + site_outputs + [entry["dest"] for section in (new["static"], records) for entry in section.values()]
+        new["compressed"], stats = compress.process_outputs(targets, old.get("compressed", {}), pages if minify else (), precompress)
+        if profiling.active():
+            profiling.active().add_section('compress', time.perf_counter() - start, **stats)
+        if profiling.output != 'quiet':
+            print(f"Minified {stats['minified']} and compressed {stats['compressed']} of {stats['files']} text outputs")
+    manifest.save_manifest(new)
+    links.save_index(index)
+    assets.save_assets(records)
+    images.save_state(image_state)
+    if cache:
+        parse_cache.active().prune()
+        fragments.active().save()
+        if profiling.active():
+            profiling.active().add_section('fragments', 0.0, **fragments.active().stats())
+    return new, errors
+
+
+def check_links(state):
+    import links
+    index = links.load_index()
+    outputs = [entry["dest"] for section in ("pages", "static") for entry in state[section].values()]
+    broken = links.broken_links(index, outputs, 'public')
+    for page, target in broken:
+        print(f"broken link: {page} -> {target}")
+    static_outputs = [entry["dest"] for entry in state["static"].values()]
+    for dest in links.unreferenced(index, static_outputs, 'public'):
+        print(f"unreferenced static file: {dest}")
+    return broken
+
+
+def watch_and_serve(full=False, jobs=1, cache=True, link='reflink', port=8888, polling=False, interval=0.25, minify=False, precompress=False):
+    import links
+    import manifest
+    import watch
+    state, _ = build(full=full, jobs=jobs, cache=cache, link=link, minify=minify, precompress=precompress)
+    index = links.load_index()
+    server = watch.serve('public', port)
+    watcher = watch.make_watcher(['content', 'static', 'template.html'], interval, polling)
+    print(f"Serving public/ on http://localhost:{port}/ and watching content/, static/ and template.html")
+    try:
+        while True:
+            changed = watcher.changes()
+            start = time.perf_counter()
+            watch.rebuild_changed(changed, state, index, jobs=jobs, link=link, minify=minify, precompress=precompress)
+            print(f"Rebuilt {len(changed)} changed file(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        server.shutdown()
+        manifest.save_manifest(state)
+        links.save_index(index)
+
+
+def render_one(path, template='template.html'):
+    import helper_functions
+    with open(path) as fh:
+        return helper_functions.render_page(fh.read(), template)
+
 
+def check_pages(paths, template='template.html'):
+    errors = []
+    for path in paths:
+        try:
+            render_one(path, template)
+        except Exception as e:
+            errors.append((path, f"{type(e).__name__}: {e}"))
+    return errors
 
-def main():
-    clean_public()
-    helper_functions.generate_pages_recursive('content', 'template.html', 'public')
 
+def folder_size(path):
+    files = 0
+    size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+def build_stats():
+    import assets
+    import links
+    import manifest
+    import parse_cache
+    import site_index
+    state = manifest.load_manifest()
+    index = links.load_index()
+    stats = {
+        "pages": len(state["pages"]),
+        "page bytes": sum(entry["size"] for entry in state["pages"].values()),
+        "static files": len(state["static"]),
+        "static bytes": sum(entry["size"] for entry in state["static"].values()),
+        "compressed outputs": len(state["compressed"]),
+        "links": sum(len(entry["links"]) for entry in index["pages"].values()),
+        "images": sum(len(entry["images"]) for entry in index["pages"].values()),
+        "fingerprinted assets": len(assets.load_assets()),
+        "indexed pages": len(site_index.load_store()["pages"]),
+    }
+    stats["parse cache files"], stats["parse cache bytes"] = folder_size(parse_cache.CACHE_DIR)
+    return stats
+
+
+def shard_arg(value):
+    import shards
+    try:
+        return shards.parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(description="Build the static site into public/")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    build_parser = commands.add_parser('build', help="build the site (the default command)")
+    build_parser.add_argument('--full', action='store_true', help="ignore the build manifest and rebuild everything")
+    build_parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N', help="render pages in N worker processes (0 = one per CPU)")
+    build_parser.add_argument('--async-io', type=int, default=0, metavar='N', help="overlap reads, renders and writes with N concurrent file operations")
+    build_parser.add_argument('--no-cache', action='store_true', help="do not reuse rendered HTML from the parse cache")
+    build_parser.add_argument('--link', choices=LINK_MODES, default='reflink', help="how to place static files in public/ (falls back to copy)")
+    build_parser.add_argument('--checksum', action='store_true', help="compare static files by content instead of size and mtime")
+    build_parser.add_argument('--minify', action='store_true', help="strip insignificant whitespace and comments from generated pages")
+    build_parser.add_argument('--compress', action='store_true', help="write .gz (and .br when brotli is installed) next to every changed text output")
+    build_parser.add_argument('--fingerprint', action='store_true', help="copy static files to content-hashed names and point pages at them")
+    build_parser.add_argument('--images', action='store_true', help="add width, height, srcset and lazy loading to images (variants need Pillow)")
+    build_parser.add_argument('--site-url', metavar='URL', help="write sitemap.xml, feed.xml and search-index.json for the site at URL")
+    build_parser.add_argument('--shard', type=shard_arg, metavar='I/N', help="render only shard I of N into SHARD_DIR/I")
+    build_parser.add_argument('--shard-dir', default='shards', help="where --shard writes and --merge reads shard outputs")
+    build_parser.add_argument('--merge', action='store_true', help="verify the shard outputs and combine them into public/")
+    build_parser.add_argument('--profile', metavar='REPORT', help="write per-stage timings for every page to REPORT as JSON")
+    build_parser.add_argument('--top', type=int, default=10, metavar='N', help="number of slowest pages to list with --profile")
+    output = build_parser.add_mutually_exclusive_group()
+    output.add_argument('--verbose', '-v', dest='output', action='store_const', const='verbose', help="print a line for every page")
+    output.add_argument('--quiet', '-q', dest='output', action='store_const', const='quiet', help="only print errors")
+    build_parser.set_defaults(output='progress')
+    build_parser.add_argument('--check-links', action='store_true', help="report broken internal links and unreferenced static files")
+    build_parser.add_argument('--validate', action='store_true', help="type-check every HTML node while rendering")
+    build_parser.add_argument('--watch', action='store_true', help="rebuild changed pages on edit and serve public/")
+    build_parser.add_argument('--port', type=int, default=8888, help="port for the --watch server")
+    build_parser.add_argument('--poll', action='store_true', help="poll for changes instead of using watchdog")
+    build_parser.add_argument('--interval', type=float, default=0.25, help="seconds between polls")
+
+    render_parser = commands.add_parser('render-one', help="render a single markdown file without building the site")
+    render_parser.add_argument('file')
+    render_parser.add_argument('--template', default='template.html')
+    render_parser.add_argument('--output', '-o', metavar='FILE', help="write the page to FILE instead of stdout")
+    render_parser.add_argument('--validate', action='store_true', help="type-check every HTML node while rendering")
+
+    check_parser = commands.add_parser('check', help="render FILES in memory, or check links of the last build")
+    check_parser.add_argument('files', nargs='*')
+    check_parser.add_argument('--template', default='template.html')
+
+    commands.add_parser('stats', help="summarize the last build from .build/")
+
+    daemon_parser = commands.add_parser('daemon', help="keep the renderer warm and serve render requests on a socket")
+    daemon_parser.add_argument('--socket', default='.build/render.sock', help="Unix socket to listen on")
+    daemon_parser.add_argument('--port', type=int, help="listen on localhost TCP instead of a Unix socket")
+    daemon_parser.add_argument('--host', default='127.0.0.1')
+    daemon_parser.add_argument('--template', default='template.html')
+    return parser
+
+
+def run_build(parser, args):
+    import helper_functions
+    import htmlnode
+    import profiling
+    profiling.set_output(args.output)
+    htmlnode.validate = args.validate
+    if args.profile:
+        profiling.enable()
+    if args.shard or args.merge:
+        # Shards are plain renders; these stages would make the merged tree differ from a build.
+        unsupported = [flag for flag, value in (('--minify', args.minify), ('--compress', args.compress),
+                                                ('--fingerprint', args.fingerprint), ('--images', args.images),
+                                                ('--site-url', args.site_url), ('--async-io', args.async_io),
+                                                ('--watch', args.watch)) if value]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} not supported with --shard or --merge")
+    if args.shard:
+        import shards
+        errors = shards.build_shard(*args.shard, shard_dir=args.shard_dir, jobs=args.jobs, link=args.link)
+        if errors:
+            print(f"{len(errors)} page(s) failed in shard {args.shard[0]}/{args.shard[1]}")
+            return 1
+        return 0
+    if args.merge:
+        import shards
+        try:
+            merged = shards.merge(args.shard_dir, 'public', args.link)
+        except shards.ShardMergeError as e:
+            for problem in e.problems:
+                print(problem)
+            return 1
+        print(f"Merged {merged} files from {args.shard_dir} into public/")
+        return 0
+    if args.watch:
+        if args.fingerprint or args.images:
+            parser.error("--fingerprint and --images are not supported with --watch")
+        watch_and_serve(args.full, args.jobs, not args.no_cache, args.link, args.port, args.poll, args.interval,
+                        args.minify, args.compress)
+        return 0
+    state, errors = build(args.full, args.jobs, not args.no_cache, args.link, args.checksum, args.async_io,
+                          args.minify, args.compress, args.fingerprint, args.images, args.site_url)
+    if args.profile:
+        profiling.active().write_report(args.profile, args.top)
+        print(profiling.active().summary(args.top))
+    if errors:
+        raise helper_functions.PageBuildError(errors)
+    if args.check_links and check_links(state):
+        return 1
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Plain options without a command keep meaning "build".
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv.insert(0, 'build')
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        return run_build(parser, args)
+    if args.command == 'render-one':
+        import htmlnode
+        htmlnode.validate = args.validate
+        html = render_one(args.file, args.template)
+        if args.output:
+            with open(args.output, 'w') as fh:
+                fh.write(html)
+        else:
+            sys.stdout.write(html)
+        return 0
+    if args.command == 'check':
+        if args.files:
+            errors = check_pages(args.files, args.template)
+            for path, error in errors:
+                print(f"{path}: {error}")
+            return 1 if errors else 0
+        import manifest
+        return 1 if check_links(manifest.load_manifest()) else 0
+    if args.command == 'daemon':
+        import daemon
+        try:
+            daemon.serve(daemon.address_arg(args), args.template)
+        except daemon.SocketInUseError as e:
+            print(e)
+            return 1
+        return 0
+    for key, value in build_stats().items():
+        print(f"{key:<20} {value}")
+    return 0
 
-main()
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import hashlib
+import os
+
+import jsonfile
+import profiling
+
+
+MANIFEST_PATH = '.build/manifest.json'
+MANIFEST_VERSION = 1
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def new_manifest():
+    return {"version": MANIFEST_VERSION, "template": {}, "pages": {}, "static": {}, "compressed": {}}
+
+
+def load_manifest(path=MANIFEST_PATH):
+    manifest = jsonfile.read_json(path)
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return new_manifest()
+    return manifest
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    jsonfile.write_json_atomic(path, manifest)
+
+
+def is_changed(old_section, source, digest, dest, outputs=None):
+    entry = old_section.get(source)
+    if entry is None or entry.get("hash") != digest:
+        return True
+    if outputs is not None:
+        return dest not in outputs
+    return not os.path.exists(dest)
+
+
+def page_hash(old_section, entry):
+    # Reuse the recorded hash while size and mtime match, like the static sync.
+    old = old_section.get(entry.source)
+    if old and old.get("size") == entry.size and old.get("mtime") == entry.mtime:
+        return old["hash"]
+    return hash_file(entry.source)
+
+
+def stale_outputs(old, new):
+    stale = []
+    for section in ("pages", "static"):
+        current = {entry["dest"] for entry in new.get(section, {}).values()}
+        for source, entry in old.get(section, {}).items():
+            if source not in new.get(section, {}) and entry["dest"] not in current:
+                stale.append(entry["dest"])
+    return sorted(stale)
+
+
+def remove_outputs(paths, root):
+    root = os.path.normpath(root)
+    for path in paths:
+        if os.path.isfile(path):
+            if profiling.output != 'quiet':
+                print(f"Removing stale output {path}")
+            os.remove(path)
+        folder = os.path.dirname(os.path.normpath(path))
+        while folder.startswith(root + os.sep) and os.path.isdir(folder) and not os.listdir(folder):
+            os.rmdir(folder)
+            folder = os.path.dirname(folder)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+
+import assets
+import images
+
+
+CACHE_DIR = '.build/parse-cache'
+# Rendering is helper_functions plus every local module it imports, so the
+# version follows code as it moves between modules.
+PARSER_ROOT = 'helper_functions'
+IMPORT_RE = re.compile(r'^[ \t]*(?:from[ \t]+(\w+)[ \t]+import|import[ \t]+([\w, \t]+))', re.M)
+
+_version = None
+_active = None
+
+
+def parser_modules(here=None):
+    here = here or os.path.dirname(os.path.abspath(__file__))
+    found = {}
+    todo = [PARSER_ROOT]
+    while todo:
+        name = todo.pop()
+        path = os.path.join(here, f'{name}.py')
+        if name in found or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as fh:
+            found[name] = fh.read()
+        for module, names in IMPORT_RE.findall(found[name].decode()):
+            todo.extend([module] if module else [item.strip() for item in names.split(',')])
+    return {f'{name}.py': found[name] for name in sorted(found)}
+
+
+def cache_version():
+    global _version
+    if _version is None:
+        h = hashlib.sha256()
+        for name, source in parser_modules().items():
+            h.update(f'{name}\0'.encode())
+            h.update(source)
+        _version = h.hexdigest()[:16]
+    return _version
+
+
+def cache_key(markdown):
+    h = hashlib.sha256(cache_version().encode())
+    # Rendered images depend on the fingerprinted asset names and image sizes.
+    h.update(f'\0{assets.version()}\0{images.version()}\0'.encode())
+    h.update(markdown.encode())
+    return h.hexdigest()
+
+
+class ParseCache:
+    def __init__(self, path=CACHE_DIR, max_chars=64 << 20, max_disk_bytes=512 << 20):
+        self.path = path
+        self.max_chars = max_chars
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], f'{key}.json')
+
+    def _remember(self, key, value, size):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_chars and self.entries:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+    def get(self, markdown):
+        key = cache_key(markdown)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        data = None
+        if self.path:
+            try:
+                with open(self._file(key)) as fh:
+                    data = fh.read()
+                os.utime(self._file(key))
+            except OSError:
+                data = None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        value = json.loads(data)
+        self._remember(key, value, len(data))
+        return value
+
+    def put(self, markdown, value):
+        key = cache_key(markdown)
+        data = json.dumps(value)
+        self._remember(key, value, len(data))
+        if not self.path:
+            return
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+
+    def prune(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        files = []
+        total = 0
+        for folder in os.listdir(self.path):
+            for name in os.listdir(os.path.join(self.path, folder)):
+                st = os.stat(os.path.join(self.path, folder, name))
+                files.append((st.st_mtime_ns, st.st_size, os.path.join(self.path, folder, name)))
+                total += st.st_size
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+
+def enable(cache):
+    global _active
+    _active = cache
+    return cache
+
+
+def disable():
+    enable(None)
+
+
+def active():
+    return _active
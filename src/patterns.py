@@ -0,0 +1,27 @@
+import functools
+import re
+
+
+# Block level
+BLOCK_SPLIT = re.compile(r'\s*\n\n+\s*')
+HEADING = re.compile(r'(^#+)(?: )')
+# One match decides what a line of a block can be: group 1 is a quote
+# marker, group 2 an unordered list marker, group 3 an ordered list number.
+LINE_KIND = re.compile(r'(>)|([*-] )|(\d+)\. ')
+LINE_QUOTE, LINE_UNORDERED, LINE_ORDERED = 1, 2, 3
+IMAGE_PARAGRAPH = re.compile(r'^!?\[.+?\]\(.+?\)$')
+
+# Inline level
+INLINE_DELIMITER = re.compile(r'\*\*|_|`')
+INLINE_LINK = re.compile(r'(?<!!)\[(.+?)\]\((.*?)\)')
+INLINE_IMAGE = re.compile(r'(?<!!)!\[(.+?)\]\((.*?)\)')
+
+
+@functools.lru_cache(maxsize=None)
+def link_split(prefix=""):
+    return re.compile(fr'(?<!!)({re.escape(prefix)}\[.+?\]\(.*?\))')
+
+
+@functools.lru_cache(maxsize=None)
+def link_extract(prefix=""):
+    return re.compile(fr'(?:^| ){re.escape(prefix)}\[(.+?)\]\((.+?)\)')
@@ -0,0 +1,141 @@
+import contextlib
+import json
+import sys
+import time
+
+
+STAGES = ('read', 'markdown_to_blocks', 'block_to_block_type', 'inline', 'to_html', 'template', 'write')
+OUTPUT_MODES = ('verbose', 'progress', 'quiet')
+
+_null = contextlib.nullcontext()
+_page = None
+enabled = False
+output = 'verbose'
+
+
+class Profiler:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.pages = {}
+        self.sections = {}
+
+    def add_page(self, path, stages):
+        self.pages[path] = stages
+
+    def add_section(self, name, seconds, **counters):
+        section = self.sections.setdefault(name, {"seconds": 0.0})
+        section["seconds"] += seconds
+        for key, value in counters.items():
+            section[key] = section.get(key, 0) + value
+
+    def totals(self):
+        totals = dict.fromkeys(STAGES, 0.0)
+        for stages in self.pages.values():
+            for name, seconds in stages.items():
+                if name != "total":
+                    totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def slowest(self, n=10):
+        ranked = sorted(self.pages.items(), key=lambda item: (-item[1]["total"], item[0]))
+        return [(path, stages["total"]) for path, stages in ranked[:n]]
+
+    def report(self, n=10):
+        return {
+            "wall_seconds": time.perf_counter() - self.start,
+            "pages": len(self.pages),
+            "page_seconds": sum(stages["total"] for stages in self.pages.values()),
+            "stages": self.totals(),
+            "sections": self.sections,
+            "slowest": [{"path": path, "seconds": seconds} for path, seconds in self.slowest(n)],
+            "per_page": self.pages,
+        }
+
+    def write_report(self, path, n=10):
+        with open(path, 'w') as fh:
+            json.dump(self.report(n), fh, indent=1, sort_keys=True)
+
+    def summary(self, n=10):
+        report = self.report(n)
+        lines = [f"Built {report['pages']} pages in {report['wall_seconds']:.3f}s"]
+        for name, seconds in sorted(report["stages"].items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<20} {seconds:.4f}s")
+        for name, section in sorted(report["sections"].items()):
+            extra = " ".join(f"{key}={value}" for key, value in sorted(section.items()) if key != "seconds")
+            lines.append(f"  {name:<20} {section['seconds']:.4f}s {extra}".rstrip())
+        lines.append(f"Slowest {len(report['slowest'])} pages:")
+        for entry in report["slowest"]:
+            lines.append(f"  {entry['seconds'] * 1000:9.2f} ms  {entry['path']}")
+        return "\n".join(lines)
+
+
+_profiler = None
+
+
+def enable(profiler=None):
+    global _profiler, enabled
+    _profiler = profiler or Profiler()
+    enabled = True
+    return _profiler
+
+
+def disable():
+    global _profiler, enabled
+    _profiler = None
+    enabled = False
+
+
+def active():
+    return _profiler
+
+
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        _page[self.name] = _page.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+def stage(name):
+    if _page is None:
+        return _null
+    return _Stage(name)
+
+
+def begin_page():
+    global _page
+    if enabled:
+        _page = {"start": time.perf_counter()}
+
+
+def end_page():
+    global _page
+    if _page is None:
+        return None
+    stages = _page
+    _page = None
+    stages["total"] = time.perf_counter() - stages.pop("start")
+    return stages
+
+
+def set_output(mode):
+    global output
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown output mode {mode}")
+    output = mode
+
+
+def page_done(done, total, message):
+    if output == 'verbose':
+        print(message)
+    elif output == 'progress' and sys.stderr.isatty():
+        sys.stderr.write(f"\r[{done}/{total}] pages")
+        if done == total:
+            sys.stderr.write("\n")
+        sys.stderr.flush()
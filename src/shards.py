@@ -0,0 +1,146 @@
+import hashlib
+import heapq
+import json
+import os
+import shutil
+
+import build_plan
+import helper_functions
+import jsonfile
+import static_sync
+
+
+SHARD_DIR = 'shards'
+SHARD_MANIFEST = 'shard.json'
+# Per-file cost added to the size so shards of tiny pages still split evenly.
+FILE_COST = 4096
+
+
+class ShardMergeError(Exception):
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__("\n".join(problems))
+
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {value}")
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard {index} is not in 1..{count}")
+    return index, count
+
+
+def path_key(path):
+    return hashlib.sha256(path.encode()).hexdigest()
+
+
+def assign(entries, count, root):
+    # Largest first onto the lightest shard. Ties are broken by a hash of
+    # the relative path, so every node computes the same assignment.
+    loads = [(0, shard) for shard in range(1, count + 1)]
+    shards = {}
+    for entry in sorted(entries, key=lambda entry: (-entry.size, path_key(entry.dest[len(root):]))):
+        load, shard = heapq.heappop(loads)
+        shards[entry.source] = shard
+        heapq.heappush(loads, (load + entry.size + FILE_COST, shard))
+    return shards
+
+
+def plan_digest(plan, root):
+    h = hashlib.sha256()
+    for entry in sorted(plan, key=lambda entry: entry.dest):
+        h.update(f'{entry.dest[len(root):]}\0{entry.kind}\0{entry.size}\0'.encode())
+    return h.hexdigest()
+
+
+def build_shard(index, count, content='content', static='static', template='template.html', shard_dir=SHARD_DIR, jobs=1, link='reflink'):
+    out = f'{shard_dir}/{index}'
+    if os.path.exists(out):
+        shutil.rmtree(out)
+    os.makedirs(out)
+    plan = build_plan.make_plan(content, static, out)
+    owners = {}
+    for kind in (build_plan.PAGE, build_plan.STATIC):
+        owners.update(assign(build_plan.of_kind(plan, kind), count, out))
+    mine = [entry for entry in plan if owners[entry.source] == index]
+    for entry in mine:
+        if entry.kind == build_plan.STATIC:
+            static_sync.sync_file(entry.source, entry.dest, link)
+    pages = [(entry.source, entry.dest) for entry in mine if entry.kind == build_plan.PAGE]
+    errors = helper_functions.generate_pages(pages, template, jobs, sizes={entry.source: entry.size for entry in mine})
+    failed = {path for path, _ in errors}
+    shard = {
+        "shard": index,
+        "count": count,
+        "plan": plan_digest(plan, out),
+        "expected": sorted(entry.dest[len(out):] for entry in plan),
+        "outputs": {entry.dest[len(out):]: entry.source for entry in mine if entry.source not in failed},
+        "errors": [[path, error] for path, error in errors],
+    }
+    jsonfile.write_json_atomic(f'{out}/{SHARD_MANIFEST}', shard)
+    return errors
+
+
+def load_shards(shard_dir=SHARD_DIR):
+    shards = []
+    if not os.path.isdir(shard_dir):
+        return shards
+    for name in sorted(os.listdir(shard_dir)):
+        path = f'{shard_dir}/{name}/{SHARD_MANIFEST}'
+        if os.path.isfile(path):
+            with open(path) as fh:
+                shards.append((f'{shard_dir}/{name}', json.load(fh)))
+    return shards
+
+
+def verify(shards):
+    if not shards:
+        return ["no shard outputs found"]
+    problems = []
+    count = shards[0][1]["count"]
+    digest = shards[0][1]["plan"]
+    seen = {}
+    for out, shard in shards:
+        if shard["count"] != count or shard["plan"] != digest:
+            problems.append(f"{out} was built from a different content tree or shard count")
+        seen.setdefault(shard["shard"], []).append(out)
+        for path, error in shard["errors"]:
+            problems.append(f"{out}: {path}: {error}")
+    for index in range(1, count + 1):
+        if index not in seen:
+            problems.append(f"shard {index}/{count} is missing")
+        elif len(seen[index]) > 1:
+            problems.append(f"shard {index}/{count} appears more than once: {', '.join(seen[index])}")
+    owners = {}
+    for out, shard in shards:
+        for dest in shard["outputs"]:
+            owners.setdefault(dest, []).append(out)
+            if not os.path.isfile(f'{out}{dest}'):
+                problems.append(f"{out}{dest} is listed but was not written")
+    expected = set(shards[0][1]["expected"])
+    for dest in sorted(expected - set(owners)):
+        problems.append(f"{dest} is missing from every shard")
+    for dest, outs in sorted(owners.items()):
+        if len(outs) > 1:
+            problems.append(f"{dest} is duplicated in {', '.join(outs)}")
+        elif dest not in expected:
+            problems.append(f"{dest} from {outs[0]} is not part of the build plan")
+    return problems
+
+
+def merge(shard_dir=SHARD_DIR, public='public', link='reflink'):
+    shards = load_shards(shard_dir)
+    problems = verify(shards)
+    if problems:
+        raise ShardMergeError(problems)
+    if os.path.exists(public):
+        shutil.rmtree(public)
+    os.mkdir(public)
+    merged = 0
+    for out, shard in shards:
+        for dest in sorted(shard["outputs"]):
+            static_sync.sync_file(f'{out}{dest}', f'{public}{dest}', link)
+            merged += 1
+    return merged
@@ -0,0 +1,149 @@
+import datetime
+import json
+import os
+import re
+from html import escape
+
+import jsonfile
+import links
+
+
+SITE_PATH = '.build/site.json'
+SITEMAP_NAME = 'sitemap.xml'
+FEED_NAME = 'feed.xml'
+SEARCH_NAME = 'search-index.json'
+FEED_SECTION = 'blog'
+FEED_SIZE = 20
+TOKEN_RE = re.compile(r'[a-z0-9]{2,}')
+URL_RE = re.compile(r'\]\([^)]*\)')
+
+_stack = []
+
+
+class collecting:
+    def __enter__(self):
+        self.pages = []
+        _stack.append(self.pages)
+        return self.pages
+
+    def __exit__(self, *exc):
+        _stack.pop()
+
+
+def wanted():
+    return bool(_stack)
+
+
+def record(title, summary, tokens):
+    if _stack:
+        _stack[-1].append({"title": title, "summary": summary, "tokens": tokens})
+
+
+def tokenize(markdown):
+    return sorted(set(TOKEN_RE.findall(URL_RE.sub('] ', markdown).lower())))
+
+
+def new_store():
+    return {"pages": {}}
+
+
+def load_store(path=SITE_PATH):
+    store = jsonfile.read_json(path)
+    if not isinstance(store, dict) or "pages" not in store:
+        return new_store()
+    return store
+
+
+def save_store(store, path=SITE_PATH):
+    jsonfile.write_json_atomic(path, store)
+
+
+def update_store(store, page_info, pages, public):
+    for dest, info in page_info.items():
+        entry = pages[dest]
+        store["pages"][dest] = dict(info, url=links.page_url(dest, public), source=entry["source"], mtime=entry["mtime"],
+                                    hash=entry["hash"])
+    for dest in list(store["pages"]):
+        if dest not in pages:
+            del store["pages"][dest]
+    return store
+
+
+def is_current(store, dest, digest):
+    # Pages rendered while indexing was off keep a stale entry until re-rendered.
+    return store["pages"].get(dest, {}).get("hash") == digest
+
+
+def sitemap(store, site_url):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for page in sorted(store["pages"].values(), key=lambda page: page["url"]):
+        day = datetime.datetime.fromtimestamp(page["mtime"] / 1e9, datetime.timezone.utc).date().isoformat()
+        lines.append(f'<url><loc>{escape(site_url + page["url"])}</loc><lastmod>{day}</lastmod></url>')
+    lines.append('</urlset>')
+    return "\n".join(lines) + "\n"
+
+
+def feed_pages(store, content, section=FEED_SECTION):
+    prefix = f'{content}/{section}/'
+    posts = [page for page in store["pages"].values() if page["source"].startswith(prefix)
+             and page["source"] != f'{prefix}index.md']
+    return sorted(posts, key=lambda page: (-page["mtime"], page["url"]))[:FEED_SIZE]
+
+
+def feed(store, site_url, content, title):
+    import email.utils
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<rss version="2.0">', '<channel>',
+             f'<title>{escape(title)}</title>', f'<link>{escape(site_url)}/</link>',
+             f'<description>{escape(title)}</description>']
+    for page in feed_pages(store, content):
+        link = escape(site_url + page["url"])
+        lines.append(f'<item><title>{escape(page["title"])}</title><link>{link}</link><guid>{link}</guid>'
+                     f'<pubDate>{email.utils.formatdate(page["mtime"] / 1e9, usegmt=True)}</pubDate>'
+                     f'<description>{escape(page["summary"])}</description></item>')
+    lines += ['</channel>', '</rss>']
+    return "\n".join(lines) + "\n"
+
+
+def search_index(store):
+    pages = sorted(store["pages"].values(), key=lambda page: page["url"])
+    terms = {}
+    for number, page in enumerate(pages):
+        for token in page["tokens"]:
+            terms.setdefault(token, []).append(number)
+    index = {"pages": [[page["url"], page["title"], page["summary"]] for page in pages],
+             "terms": dict(sorted(terms.items()))}
+    return json.dumps(index, separators=(',', ':'), ensure_ascii=False)
+
+
+def write_if_changed(path, text):
+    try:
+        with open(path) as fh:
+            if fh.read() == text:
+                return False
+    except OSError:
+        pass
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+    return True
+
+
+def emit(store, public, site_url, content='content'):
+    site_url = site_url.rstrip('/')
+    root = store["pages"].get(f'{public}/index.html')
+    title = root["title"] if root else site_url
+    outputs = {
+        f'{public}/{SITEMAP_NAME}': sitemap(store, site_url),
+        f'{public}/{FEED_NAME}': feed(store, site_url, content, title),
+        f'{public}/{SEARCH_NAME}': search_index(store),
+    }
+    written = [path for path, text in outputs.items() if write_if_changed(path, text)]
+    return sorted(outputs), sorted(written)
+
+
+def remove_outputs(public):
+    for name in (SITEMAP_NAME, FEED_NAME, SEARCH_NAME):
+        if os.path.exists(f'{public}/{name}'):
+            os.remove(f'{public}/{name}')
@@ -0,0 +1,82 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import build_plan
+import manifest
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+FICLONE = 0x40049409
+MODES = ('copy', 'reflink', 'hardlink')
+
+
+def needs_sync(entry, output, checksum=False):
+    if output is None or output.size != entry.size:
+        return True
+    if checksum:
+        return manifest.hash_file(entry.source) != manifest.hash_file(entry.dest)
+    return output.mtime != entry.mtime
+
+
+def _reflink(src, dest):
+    if fcntl is None:
+        return False
+    try:
+        with open(src, 'rb') as fsrc, open(dest, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        if os.path.exists(dest):
+            os.remove(dest)
+        return False
+    shutil.copystat(src, dest)
+    return True
+
+
+def sync_file(src, dest, mode='reflink'):
+    os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+    tmp = f'{dest}.{os.getpid()}.tmp'
+    method = None
+    if mode == 'hardlink':
+        try:
+            os.link(src, tmp)
+            method = 'hardlink'
+        except OSError:
+            pass
+    if method is None and mode in ('reflink', 'hardlink') and _reflink(src, tmp):
+        method = 'reflink'
+    if method is None:
+        shutil.copy2(src, tmp)
+        method = 'copy'
+    os.replace(tmp, dest)
+    return method
+
+
+def sync_tree(src, dst, mode='reflink', checksum=False, workers=8, plan=None, outputs=None):
+    if mode not in MODES:
+        raise ValueError(f"Unknown sync mode {mode}")
+    if plan is None:
+        if not os.path.exists(src):
+            raise Exception(f'Where is {src}??')
+        plan = build_plan.scan(src, dst, build_plan.STATIC)
+    if outputs is None:
+        outputs = build_plan.scan_outputs(dst)
+    entries = {}
+    pending = []
+    for entry in plan:
+        entries[entry.source] = {"dest": entry.dest, "size": entry.size, "mtime": entry.mtime}
+        if needs_sync(entry, outputs.get(entry.dest), checksum):
+            pending.append((entry.source, entry.dest, entry.size))
+    stats = {"files": len(entries), "synced": len(pending), "skipped": len(entries) - len(pending), "bytes": 0, "methods": {}}
+    if not pending:
+        return entries, stats
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as pool:
+        methods = pool.map(lambda task: sync_file(task[0], task[1], mode), pending)
+        for (current, dest, size), method in zip(pending, methods):
+            stats["bytes"] += size
+            stats["methods"][method] = stats["methods"].get(method, 0) + 1
+    return entries, stats
@@ -0,0 +1,60 @@
+import os
+import re
+
+import assets
+
+
+PLACEHOLDER_RE = re.compile(r'{{\s*(\w+)\s*}}')
+
+_cache = {}
+
+
+class Template:
+    def __init__(self, source):
+        self.segments = []
+        pos = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            if match.start() > pos:
+                self.segments.append((False, source[pos:match.start()]))
+            self.segments.append((True, match.group(1), match.group(0)))
+            pos = match.end()
+        if pos < len(source):
+            self.segments.append((False, source[pos:]))
+
+    def variables(self):
+        return {segment[1] for segment in self.segments if segment[0]}
+
+    def iter_render(self, variables):
+        for segment in self.segments:
+            if not segment[0]:
+                yield segment[1]
+                continue
+            value = variables.get(segment[1])
+            if value is None:
+                yield segment[2]
+            elif isinstance(value, str):
+                yield value
+            else:
+                yield from value.iter_html()
+
+    def render(self, variables):
+        return "".join(self.iter_render(variables))
+
+    def write(self, fp, variables):
+        fp.writelines(self.iter_render(variables))
+
+
+def load_template(path):
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size, assets.version())
+    cached = _cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path) as fh:
+        template = Template(assets.rewrite_html(fh.read()))
+    _cache[path] = (key, template)
+    return template
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,83 @@
+import os
+import unittest
+
+import assets
+from fixtures import TempTree
+import helper_functions
+import templates
+from textnode import TextNode, TextType
+
+
+class TestAssets(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = f'{self.root}/public'
+        self.css = self.write('static/index.css', 'body {}')
+        self.png = self.write('static/images/a.png', 'png-a')
+
+    def tearDown(self):
+        assets.disable()
+        templates.clear_cache()
+
+    def static(self):
+        entries = {}
+        for path, dest in ((self.css, '/index.css'), (self.png, '/images/a.png')):
+            st = os.stat(path)
+            entries[path] = {"dest": f'{self.public}{dest}', "size": st.st_size, "mtime": st.st_mtime_ns}
+        return entries
+
+    def test_fingerprint(self):
+        records, changed, stale = assets.fingerprint(self.static(), self.public, {}, 'copy')
+        self.assertEqual(sorted(changed), ['/images/a.png', '/index.css'])
+        self.assertEqual(stale, [])
+        hashed = records['/index.css']["url"]
+        self.assertRegex(hashed, r'^/index\.[0-9a-f]{10}\.css$')
+        with open(f'{self.public}{hashed}') as fh:
+            self.assertEqual(fh.read(), 'body {}')
+
+        # Size and mtime unchanged: the recorded hash is trusted.
+        previous = {url: dict(record, hash='0' * 64) for url, record in records.items()}
+        _, changed, _ = assets.fingerprint(self.static(), self.public, previous, 'copy')
+        self.assertEqual(changed, ['/images/a.png', '/index.css'])
+        self.assertEqual(assets.fingerprint(self.static(), self.public, records, 'copy')[1], [])
+
+        self.write('static/index.css', 'p {}')
+        newer, changed, stale = assets.fingerprint(self.static(), self.public, records, 'copy')
+        self.assertEqual(changed, ['/index.css'])
+        self.assertEqual(stale, [records['/index.css']["dest"]])
+        self.assertNotEqual(newer['/index.css']["url"], hashed)
+
+        _, changed, stale = assets.fingerprint({}, self.public, newer)
+        self.assertEqual(sorted(changed), ['/images/a.png', '/index.css'])
+        self.assertEqual(len(stale), 2)
+
+    def test_rewrites_references(self):
+        records, _, _ = assets.fingerprint(self.static(), self.public, {}, 'copy')
+        hashed = records['/images/a.png']["url"]
+        assets.enable(records)
+        self.assertEqual(assets.asset_url('/images/a.png?v=1#top'), f'{hashed}?v=1#top')
+        self.assertEqual(assets.asset_url('https://example.com/images/a.png'), 'https://example.com/images/a.png')
+        node = helper_functions.text_node_to_html_node(TextNode('a', TextType.IMAGE, '/images/a.png'))
+        self.assertEqual(node.props["src"], hashed)
+        template = self.write('template.html', '<link href="/index.css"><a href="/other.css">{{ Content }}')
+        self.assertEqual(templates.load_template(template).render({"Content": "x"}),
+                         f'<link href="{records["/index.css"]["url"]}"><a href="/other.css">x')
+        version = assets.version()
+        assets.disable()
+        self.assertNotEqual(assets.version(), version)
+        self.assertEqual(templates.load_template(template).render({"Content": "x"}),
+                         '<link href="/index.css"><a href="/other.css">x')
+
+    def test_save_assets(self):
+        records, _, _ = assets.fingerprint(self.static(), self.public, {}, 'copy')
+        path = f'{self.root}/.build/assets.json'
+        assets.save_assets(records, path, self.public)
+        self.assertEqual(assets.load_assets(path), records)
+        self.assertTrue(os.path.exists(f'{self.public}/{assets.MANIFEST_NAME}'))
+        assets.save_assets({}, path, self.public)
+        self.assertEqual(assets.load_assets(path), {})
+        self.assertFalse(os.path.exists(f'{self.public}/{assets.MANIFEST_NAME}'))
+
+
+if __name__ == "__main__":
+    unittest.main()
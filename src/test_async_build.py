@@ -0,0 +1,94 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+
+import async_build
+from fixtures import TempTree
+import helper_functions
+import profiling
+
+
+class TestAsyncBuild(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = self.write('template.html', '{{ Title }}|{{ Content }}')
+        for i in range(8):
+            self.write(f'content/section{i % 3}/page{i}.md', f'# Page {i}\n\nBody [link](/x{i}) **{i}**')
+        self.output = profiling.output
+        profiling.set_output('quiet')
+
+    def tearDown(self):
+        profiling.set_output(self.output)
+
+    def pages(self, public):
+        return helper_functions.discover_pages(f'{self.root}/content', f'{self.root}/{public}')
+
+    def read_outputs(self, pages):
+        outputs = []
+        for _, dest in pages:
+            with open(dest) as fh:
+                outputs.append(fh.read())
+        return outputs
+
+    def test_matches_generate_pages(self):
+        serial = self.pages('serial')
+        helper_functions.generate_pages(serial, self.template)
+        for jobs, io_concurrency, queue_size in ((1, 1, 1), (1, 4, 2), (2, 3, 64)):
+            pages = self.pages(f'async{jobs}{io_concurrency}{queue_size}')
+            references = {}
+            errors = async_build.run(pages, self.template, jobs, io_concurrency, queue_size, references)
+            self.assertEqual(errors, [])
+            self.assertEqual(self.read_outputs(pages), self.read_outputs(serial))
+            self.assertEqual(references[pages[0][1]], [("link", "/x0")])
+
+    def test_errors_in_page_order(self):
+        self.write('content/section2/page5.md', 'no title here')
+        self.write('content/section0/page0.md', 'none here either')
+        pages = self.pages('public')
+        errors = helper_functions.generate_pages(pages, self.template, io_concurrency=3)
+        self.assertEqual([path for path, _ in errors], [f'{self.root}/content/section0/page0.md',
+                                                        f'{self.root}/content/section2/page5.md'])
+        self.assertTrue(errors[0][1].startswith('Exception: '))
+        self.assertFalse(os.path.exists(pages[0][1]))
+        self.assertTrue(os.path.exists(pages[1][1]))
+
+    def test_undecodable_page_is_a_page_error(self):
+        with open(f'{self.root}/content/section1/page1.md', 'wb') as fh:
+            fh.write(b'# Bad \xff\xfe bytes')
+        pages = self.pages('public')
+        errors = async_build.run(pages, self.template, io_concurrency=2)
+        self.assertEqual([path for path, _ in errors], [f'{self.root}/content/section1/page1.md'])
+        self.assertTrue(errors[0][1].startswith('UnicodeDecodeError: '))
+        self.assertTrue(os.path.exists(pages[0][1]))
+
+    def test_broken_render_executor_fails_pages(self):
+        pages = self.pages('public')
+        async_build.make_dirs(pages)
+        render_executor = ThreadPoolExecutor(max_workers=1)
+        render_executor.shutdown()
+        with ThreadPoolExecutor(max_workers=2) as io_executor:
+            results = asyncio.run(asyncio.wait_for(
+                async_build.pipeline(pages, self.template, render_executor, io_executor, 2, 2, 4), 10))
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(error.startswith('RuntimeError: ') for error, _, _ in results))
+
+    def test_make_dirs_once_per_folder(self):
+        pages = self.pages('public')
+        self.assertEqual(async_build.make_dirs(pages), 3)
+        self.assertTrue(os.path.isdir(f'{self.root}/public/section2'))
+
+    def test_profiles_pages(self):
+        profiler = profiling.enable()
+        try:
+            async_build.run(self.pages('public'), self.template, io_concurrency=2)
+        finally:
+            profiling.disable()
+        self.assertEqual(len(profiler.pages), 8)
+        stages = next(iter(profiler.pages.values()))
+        self.assertIn("read", stages)
+        self.assertIn("write", stages)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import tempfile
+import unittest
+
+import benchmark
+import helper_functions
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_corpus_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            size = benchmark.generate_corpus(a, 'mixed', pages=5, seed=3)
+            self.assertEqual(benchmark.generate_corpus(b, 'mixed', pages=5, seed=3), size)
+            self.assertEqual(benchmark.read_corpus(a), benchmark.read_corpus(b))
+
+    def test_shapes_render(self):
+        for shape in benchmark.SHAPES:
+            with tempfile.TemporaryDirectory() as root:
+                benchmark.generate_corpus(root, shape, pages=2, seed=1)
+                for doc in benchmark.read_corpus(root):
+                    self.assertTrue(helper_functions.extract_title(doc))
+                    self.assertTrue(helper_functions.markdown_to_html_node(doc).to_html().startswith('<div>'))
+
+    def test_deep_tree(self):
+        with tempfile.TemporaryDirectory() as root:
+            benchmark.generate_corpus(root, 'deep', pages=3)
+            depths = {path[len(root):].count('/') for path, _ in helper_functions.discover_pages(root, '')}
+            self.assertEqual(depths, {9})
+
+    def test_run_and_compare(self):
+        report = benchmark.run('small', pages=3, repeat=1)
+        self.assertEqual(set(report["results"]), {"text_to_textnodes", "markdown_to_html_node", "to_html", "build"})
+        for entry in report["results"].values():
+            self.assertGreater(entry["pages_per_s"], 0)
+        slower = {"shape": "small", "pages": 3, "seed": 0, "jobs": 1,
+                  "results": {name: dict(entry, seconds=entry["seconds"] * 2) for name, entry in report["results"].items()}}
+        regressions, _ = benchmark.compare(slower, report)
+        self.assertEqual(sorted(regressions), sorted(report["results"]))
+        regressions, _ = benchmark.compare(report, slower)
+        self.assertEqual(regressions, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
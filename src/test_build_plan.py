@@ -0,0 +1,49 @@
+import os
+import unittest
+
+import build_plan
+from fixtures import TempTree
+import manifest
+
+
+class TestBuildPlan(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write('content/index.md', '# Home')
+        self.write('content/notes.md/page.md', '# Page')
+        self.write('content/b/readme.mdx', 'raw')
+        self.write('static/images/a.png', 'png-a')
+        self.write('static/index.css', 'body {}')
+
+    def test_make_plan(self):
+        plan = build_plan.make_plan(f'{self.root}/content', f'{self.root}/static', 'public')
+        self.assertEqual([(entry.source[len(self.root):], entry.dest, entry.kind) for entry in plan], [
+            ('/content/b/readme.mdx', 'public/b/readme.mdx', 'page'),
+            ('/content/index.md', 'public/index.html', 'page'),
+            ('/content/notes.md/page.md', 'public/notes.md/page.html', 'page'),
+            ('/static/images/a.png', 'public/images/a.png', 'static'),
+            ('/static/index.css', 'public/index.css', 'static'),
+        ])
+        st = os.stat(f'{self.root}/static/index.css')
+        self.assertEqual((plan[-1].size, plan[-1].mtime), (st.st_size, st.st_mtime_ns))
+        self.assertEqual(len(build_plan.of_kind(plan, build_plan.STATIC)), 2)
+
+    def test_missing_static(self):
+        with self.assertRaises(Exception):
+            build_plan.make_plan(f'{self.root}/content', f'{self.root}/nope', 'public')
+
+    def test_scan_outputs(self):
+        self.assertEqual(build_plan.scan_outputs(f'{self.root}/public'), {})
+        outputs = build_plan.scan_outputs(f'{self.root}/static')
+        self.assertEqual(sorted(outputs), [f'{self.root}/static/images/a.png', f'{self.root}/static/index.css'])
+
+    def test_page_hash_reuses_unchanged(self):
+        entry = build_plan.scan(f'{self.root}/content', 'public', build_plan.PAGE)[1]
+        old = {entry.source: {"hash": "recorded", "size": entry.size, "mtime": entry.mtime}}
+        self.assertEqual(manifest.page_hash(old, entry), "recorded")
+        old[entry.source]["mtime"] += 1
+        self.assertEqual(manifest.page_hash(old, entry), manifest.hash_file(entry.source))
+
+
+if __name__ == "__main__":
+    unittest.main()
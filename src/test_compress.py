@@ -0,0 +1,60 @@
+import gzip
+import os
+import unittest
+
+import compress
+from fixtures import TempTree
+
+
+class TestMinify(unittest.TestCase):
+    def test_block_whitespace(self):
+        html = "<!DOCTYPE html>\n<html>\n<head>\n    <title> Hi </title>\n</head>\n<body>\n  <p>a  <b>b</b>\n c</p>\n</body>\n</html>\n"
+        self.assertEqual(compress.minify_html(html),
+                         "<!DOCTYPE html><html><head><title>Hi</title></head><body><p>a <b>b</b> c</p></body></html>")
+
+    def test_preserved_and_comments(self):
+        html = "<div>\n<!-- note -->\n<code>x  =\n  1</code>\n<pre>a\n\n b</pre> <!--[if IE]>keep<![endif]-->\n</div>"
+        self.assertEqual(compress.minify_html(html),
+                         "<div><code>x  =\n  1</code> <pre>a\n\n b</pre> <!--[if IE]>keep<![endif]--></div>")
+
+
+class TestProcessOutputs(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.page = self.write('index.html', '<div>\n  <p>hello</p>\n</div>\n')
+        self.css = self.write('index.css', 'body {}\n' * 50)
+        self.png = self.write('a.png', 'png')
+
+    def test_compresses_changed_text_outputs(self):
+        paths = [self.page, self.css, self.png]
+        records, stats = compress.process_outputs(paths, {}, [self.page])
+        self.assertEqual(sorted(records), [self.css, self.page])
+        self.assertEqual((stats["files"], stats["minified"], stats["compressed"]), (2, 1, 2))
+        with open(self.page) as fh:
+            self.assertEqual(fh.read(), '<div><p>hello</p></div>')
+        with gzip.open(f'{self.css}.gz', 'rt') as fh:
+            self.assertEqual(fh.read(), 'body {}\n' * 50)
+        self.assertFalse(os.path.exists(f'{self.png}.gz'))
+
+        records, stats = compress.process_outputs(paths, records, [self.page])
+        self.assertEqual(stats["skipped"], 2)
+
+        # Rewritten with the same content: rehashed but not recompressed.
+        self.write('index.css', 'body {}\n' * 50)
+        records, stats = compress.process_outputs(paths, records)
+        self.assertEqual(stats["compressed"], 0)
+        self.write('index.css', 'p {}')
+        records, stats = compress.process_outputs(paths, records)
+        self.assertEqual(stats["compressed"], 1)
+        with gzip.open(f'{self.css}.gz', 'rt') as fh:
+            self.assertEqual(fh.read(), 'p {}')
+
+    def test_gzip_is_reproducible(self):
+        self.assertEqual(compress.compress_data(b'abc', '.gz'), compress.compress_data(b'abc', '.gz'))
+
+    def test_siblings(self):
+        self.assertEqual(compress.siblings(['a.html']), ['a.html.gz', 'a.html.br'])
+
+
+if __name__ == "__main__":
+    unittest.main()
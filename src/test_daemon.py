@@ -0,0 +1,93 @@
+import os
+import socket
+import threading
+import unittest
+
+import daemon
+from fixtures import TempTree
+import fragments
+
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+
+class TestDaemon(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = self.write('template.html', TEMPLATE)
+        self.address = f'{self.root}/render.sock'
+        self.server = self.start(self.address)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def start(self, address):
+        server = daemon.make_server(address, self.template)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        return server
+
+    def test_render_page(self):
+        with daemon.Client(self.address, timeout=5) as client:
+            self.assertEqual(client.render("# Hi\n\nSome **bold**"),
+                             "<html><title>Hi</title><body><div><h1>Hi</h1><p>Some <b>bold</b></p></div></body></html>")
+            self.assertEqual(client.render("Just _this_", fragment=True), "<div><p>Just <i>this</i></p></div>")
+        self.assertEqual(self.server.served, 2)
+        self.assertIsNone(fragments.active())
+
+    def test_render_error_keeps_connection(self):
+        with daemon.Client(self.address, timeout=5) as client:
+            with self.assertRaisesRegex(Exception, "No H1 header Found"):
+                client.render("no title")
+            self.assertIn("<h1>Back</h1>", client.render("# Back"))
+
+    def test_rejects_oversized_frame(self):
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.settimeout(5)
+            sock.connect(self.address)
+            sock.sendall(daemon.HEADER.pack(daemon.MAX_FRAME + 1))
+            response = daemon.read_frame(sock)
+        self.assertIn("ProtocolError", response["error"])
+
+    def test_concurrent_clients(self):
+        docs = [f"# Page {i}\n\n- item {i}\n- shared item" for i in range(20)]
+        report = daemon.bench(self.address, docs, requests=100, concurrency=4)
+        self.assertEqual((report["requests"], report["errors"]), (100, 0))
+        self.assertLessEqual(report["p50_ms"], report["p99_ms"])
+        self.assertEqual(self.server.served, 100)
+
+    def test_tcp(self):
+        server = self.start(('127.0.0.1', 0))
+        try:
+            with daemon.Client(server.server_address, timeout=5) as client:
+                self.assertIn("<h1>Tcp</h1>", client.render("# Tcp"))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_replaces_stale_socket(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertTrue(os.path.exists(self.address))
+        self.server = self.start(self.address)
+        with daemon.Client(self.address, timeout=5) as client:
+            self.assertIn("<h1>Again</h1>", client.render("# Again"))
+
+    def test_refuses_live_socket_and_other_files(self):
+        with self.assertRaisesRegex(daemon.SocketInUseError, "already listening"):
+            daemon.make_server(self.address, self.template)
+        with daemon.Client(self.address, timeout=5) as client:
+            self.assertIn("<h1>Still</h1>", client.render("# Still"))
+        with self.assertRaisesRegex(daemon.SocketInUseError, "not a socket"):
+            daemon.make_server(self.template, self.template)
+        with open(self.template) as fh:
+            self.assertIn("{{ Content }}", fh.read())
+
+    def test_percentile(self):
+        values = list(range(100))
+        self.assertEqual(daemon.percentile(values, 0.5), 50)
+        self.assertEqual(daemon.percentile(values, 0.99), 99)
+
+
+if __name__ == "__main__":
+    unittest.main()
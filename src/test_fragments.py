@@ -0,0 +1,66 @@
+import os
+import unittest
+
+import async_build
+from fixtures import TempTree
+import fragments
+import helper_functions
+import links
+import profiling
+
+
+class TestFragments(TempTree, unittest.TestCase):
+    def tearDown(self):
+        fragments.disable()
+
+    def test_lru_bound_and_counters(self):
+        cache = fragments.FragmentCache(max_chars=30)
+        cache.put('aaaa', '<p>aaaa</p>', [])
+        cache.put('bb', '<p>bb</p>', [])
+        self.assertEqual(cache.get('aaaa'), ('<p>aaaa</p>', []))
+        cache.put('c', '<p>c</p>', [])
+        self.assertIsNone(cache.get('bb'))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "entries": 2})
+        cache.put('x' * (fragments.MAX_BLOCK + 1), '', [])
+        self.assertEqual(len(cache.entries), 2)
+
+    def test_rendering_reuses_blocks(self):
+        markdown = "# Title\n\nShared **footer** with [a link](/about)\n\n* one\n* two"
+        expected = helper_functions.markdown_to_html_node(markdown).to_html()
+        cache = fragments.enable(fragments.FragmentCache())
+        self.assertEqual(helper_functions.markdown_to_html_node(markdown).to_html(), expected)
+        self.assertEqual(cache.stats(), {"hits": 0, "misses": 3, "entries": 3})
+        with links.collecting() as refs:
+            html = helper_functions.markdown_to_html_node("# Other\n\nShared **footer** with [a link](/about)").to_html()
+        self.assertEqual(html, '<div><h1>Other</h1><p>Shared <b>footer</b> with <a href="/about">a link</a></p></div>')
+        self.assertEqual(refs, [("link", "/about")])
+        self.assertEqual(cache.hits, 1)
+
+    def test_persistence(self):
+        path = os.path.join(self.root, 'fragments.json')
+        cache = fragments.FragmentCache(path=path, version='v1')
+        cache.put('a [x](/y)', '<p>a <a href="/y">x</a></p>', [("link", "/y")])
+        cache.save()
+        loaded = fragments.FragmentCache(path=path, version='v1')
+        self.assertEqual(loaded.load(), 1)
+        self.assertEqual(loaded.get('a [x](/y)'), ('<p>a <a href="/y">x</a></p>', [("link", "/y")]))
+        self.assertEqual(fragments.FragmentCache(path=path, version='v2').load(), 0)
+
+    def test_worker_fragments_reach_the_parent(self):
+        output = profiling.output
+        profiling.set_output('quiet')
+        self.addCleanup(profiling.set_output, output)
+        template = self.write('template.html', '{{ Content }}')
+        pages = [(self.write(f'page{i}.md', f"# Page {i}\n\nShared footer"), os.path.join(self.root, 'public', f'page{i}.html'))
+                 for i in range(4)]
+        for run in (lambda: helper_functions.generate_pages(pages, template, jobs=2),
+                    lambda: async_build.run(pages, template, jobs=2, io_concurrency=2)):
+            cache = fragments.enable(fragments.FragmentCache())
+            self.assertEqual(run(), [])
+            self.assertEqual(len(cache.entries), 5)
+            self.assertEqual(cache.hits + cache.misses, 8)
+            self.assertGreaterEqual(cache.misses, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,13 @@
+import io
+import multiprocessing
+import os
 import unittest
 
+import assets
+import async_build
+from fixtures import TempTree
 import helper_functions
+import images
 from htmlnode import LeafNode, ParentNode
 from textnode import TextNode, TextType
 
@@ -113,7 +120,6 @@ class TestHelperFunctions(unittest.TestCase):
         self.assertEqual(new_nodes2, [TextNode("This is text with a [rick roll](https://i.imgur.com/aKaOqIh.gif) and [obi wan](https://i.imgur.com/fJRm4Vk.jpeg)", TextType.TEXT)])
         self.assertEqual(new_nodes3, [TextNode("LOTR image artistmonkeys", TextType.IMAGE, "/images/rivendell.png")])
 
-
     def test_split_links(self):
         text = "This is text with a link [to boot dev](https://www.boot.dev) and [to youtube](https://www.youtube.com/@bootdotdev)"
         text2 = "This is text with a link ![to boot dev](https://www.boot.dev) and ![to youtube](https://www.youtube.com/@bootdotdev)"
@@ -129,7 +135,6 @@ class TestHelperFunctions(unittest.TestCase):
                          )])
         self.assertEqual(new_nodes2, [TextNode("This is text with a link ![to boot dev](https://www.boot.dev) and ![to youtube](https://www.youtube.com/@bootdotdev)", TextType.TEXT)])
 
-
     def test_split_text_to_nodes(self):
         text = "This is **text** with an *italic* word and a ```code block``` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
         self.maxDiff = None
@@ -147,6 +152,28 @@ class TestHelperFunctions(unittest.TestCase):
                             TextNode("link", TextType.LINK, "https://boot.dev"),
                         ])
 
+    def test_text_to_textnodes_matches_chained_splits(self):
+        def chained(text):
+            nodes = helper_functions.split_nodes_delimiter([TextNode(text, TextType.TEXT)], "**", TextType.BOLD)
+            nodes = helper_functions.split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+            nodes = helper_functions.split_nodes_delimiter(nodes, "`", TextType.CODE)
+            nodes = helper_functions.split_nodes_link(nodes)
+            return helper_functions.split_nodes_image(nodes)
+        texts = [
+            "",
+            "plain text",
+            "**bold** _italic_ `code` [link](/a) ![img](/b.png)",
+            "**unclosed bold",
+            "`a_b_c` and **`x`** and _**y**_",
+            "``` spaced code ```",
+            "![a [b](c)](d) [x ![y](z)",
+            "!**[a](b)** !_x_[c](d)",
+            "***triple*** and ____",
+            "[first] then [second](url) ![](x) [l](u)![i](j)",
+        ]
+        for text in texts:
+            self.assertEqual(helper_functions.text_to_textnodes(text), chained(text), text)
+
     def test_markdown_to_blocks(self):
         md = '''
 # This is a heading
@@ -163,6 +190,21 @@ This is a paragraph of text. It has some **bold** and *italic* words inside of i
                          "* This is the first list item in a list block\n* This is a list item\n* This is another list item"
         ])
 
+    def test_markdown_to_blocks_fenced_code(self):
+        md = "# Title\n\n```\nline one\n\nline two\n```\n\nAfter the code"
+        self.assertEqual(helper_functions.markdown_to_blocks(md), [
+                         "# Title",
+                         "```\nline one\n\nline two\n```",
+                         "After the code",
+        ])
+
+    def test_iter_markdown_blocks(self):
+        md = "\n  # Heading  \n\n\n\npara\n  \nstill para\n\n* a\n* b\n"
+        self.assertEqual(list(helper_functions.iter_markdown_blocks(io.StringIO(md))),
+                         helper_functions.markdown_to_blocks(md))
+        self.assertEqual(list(helper_functions.iter_markdown_blocks(io.StringIO(md))),
+                         ["# Heading", "para\n  \nstill para", "* a\n* b"])
+
     def test_block_to_block_type(self):
         md = '''
 ## This is a heading
@@ -183,6 +225,22 @@ This is a paragraph of text. It has some **bold** and *italic* words inside of i
             helper_functions.BlockNode("* This is the first list item in a list block\n* This is a list item\n* This is another list item", helper_functions.BlockType.unordered_list, level=None),
         ])
             
+    def test_block_type_dispatch(self):
+        BlockType = helper_functions.BlockType
+        cases = {
+            "> a\n>b": (BlockType.quote, None),
+            "* a\n- b": (BlockType.unordered_list, None),
+            "1. a\n2. b\n3. c": (BlockType.ordered_list, 3),
+            "1. a\n3. b": (BlockType.paragraph, None),
+            "2. a": (BlockType.paragraph, None),
+            "* a\n> b": (BlockType.paragraph, None),
+            "> a\n1. b": (BlockType.paragraph, None),
+            "*a": (BlockType.paragraph, None),
+            "```\na\n\nb\n```\nafter": (BlockType.paragraph, None),
+        }
+        for block, (block_type, level) in cases.items():
+            self.assertEqual(helper_functions.block_to_block_type(block), helper_functions.BlockNode(block, block_type, level), block)
+
     def test_block_to_html(self):
         md = '''
 ## This is a heading
@@ -238,6 +296,84 @@ code
 
 
 
+class TestGeneratePages(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = self.write('template.html', '{{ Title }}|{{ Content }}')
+        for i in range(6):
+            self.write(f'content/section{i % 2}/page{i}.md', f'# Page {i}\n\nBody **{i}**')
+
+    def read_outputs(self, public):
+        outputs = {}
+        for from_path, dest in helper_functions.discover_pages(f'{self.root}/content', public):
+            with open(dest) as fh:
+                outputs[os.path.relpath(dest, public)] = fh.read()
+        return outputs
+
+    def test_discover_pages_sorted(self):
+        pages = helper_functions.discover_pages(f'{self.root}/content', 'public')
+        self.assertEqual([dest for _, dest in pages], [
+            'public/section0/page0.html', 'public/section0/page2.html', 'public/section0/page4.html',
+            'public/section1/page1.html', 'public/section1/page3.html', 'public/section1/page5.html',
+        ])
+
+    def test_parallel_matches_serial(self):
+        helper_functions.generate_pages_recursive(f'{self.root}/content', self.template, f'{self.root}/serial')
+        helper_functions.generate_pages_recursive(f'{self.root}/content', self.template, f'{self.root}/parallel', jobs=3)
+        serial = self.read_outputs(f'{self.root}/serial')
+        self.assertEqual(len(serial), 6)
+        self.assertEqual(serial['section1/page3.html'], 'Page 3|<div><h1>Page 3</h1><p>Body <b>3</b></p></div>')
+        self.assertEqual(serial, self.read_outputs(f'{self.root}/parallel'))
+
+    def test_workers_get_build_state_without_fork(self):
+        start_method = multiprocessing.get_start_method()
+        multiprocessing.set_start_method('forkserver', force=True)
+        self.addCleanup(multiprocessing.set_start_method, start_method, force=True)
+        self.addCleanup(assets.disable)
+        self.addCleanup(images.disable)
+        assets.enable({'/b.png': {"url": '/b.0123456789.png'}})
+        images.enable({"urls": {'/b.png': {"hash": 'd'}}, "images": {'d': {"width": 4, "height": 3, "variants": []}}})
+        self.write('content/section0/page0.md', '# Page 0\n\nSee ![b](/b.png)')
+        pages = helper_functions.discover_pages(f'{self.root}/content', f'{self.root}/public')
+        for run in (lambda: helper_functions.generate_pages(pages, self.template, jobs=2),
+                    lambda: async_build.run(pages, self.template, jobs=2, io_concurrency=2)):
+            self.assertEqual(run(), [])
+            with open(f'{self.root}/public/section0/page0.html') as fh:
+                html = fh.read()
+            self.assertIn('<img src="/b.0123456789.png" alt="b" width="4" height="3"', html)
+
+    def test_streaming_matches_in_memory(self):
+        page = self.write('content/big.md', "---\nAuthor: me\n---\nIntro\n\n# Big page\n\n```\ncode\n\nmore\n```\n\n"
+                                             + "Some **bold** and [a link](/x)\n\n* one\n* two\n\n" * 50)
+        helper_functions.generate_page(page, self.template, f'{self.root}/memory.html', quiet=True)
+        helper_functions.generate_page_streaming(page, self.template, f'{self.root}/stream.html')
+        with open(f'{self.root}/memory.html') as a, open(f'{self.root}/stream.html') as b:
+            expected = a.read()
+            self.assertEqual(b.read(), expected)
+        self.assertTrue(expected.startswith('Big page|<div><p>Intro</p><h1>Big page</h1><code>'))
+
+    def test_streaming_errors(self):
+        page = self.write('content/empty.md', "---\nTitle: Empty\n---\n\n")
+        with self.assertRaises(ValueError):
+            helper_functions.generate_page_streaming(page, self.template, f'{self.root}/empty.html')
+        self.assertFalse(os.path.exists(f'{self.root}/empty.html.tmp'))
+
+    def test_errors_reported_per_page(self):
+        self.write('content/section0/page2.md', 'no title here')
+        self.write('content/section1/page5.md', 'no title here either')
+        pages = helper_functions.discover_pages(f'{self.root}/content', f'{self.root}/public')
+        errors = helper_functions.generate_pages(pages, self.template, jobs=2)
+        self.assertEqual([path for path, _ in errors], [
+            f'{self.root}/content/section0/page2.md',
+            f'{self.root}/content/section1/page5.md',
+        ])
+        self.assertIn("No H1 header Found", errors[0][1])
+        sizes = {path: 100 - i for i, (path, _) in enumerate(reversed(pages))}
+        self.assertEqual(helper_functions.generate_pages(pages, self.template, jobs=2, sizes=sizes), errors)
+        self.assertTrue(os.path.exists(f'{self.root}/public/section1/page3.html'))
+        with self.assertRaises(helper_functions.PageBuildError):
+            helper_functions.generate_pages_recursive(f'{self.root}/content', self.template, f'{self.root}/public')
+
 
 if __name__ == "__main__":
     unittest.main()
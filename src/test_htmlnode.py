@@ -1,5 +1,8 @@
+import io
+import sys
 import unittest
 
+import htmlnode
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
 
@@ -12,6 +15,29 @@ class TestHTMLNode(unittest.TestCase):
         node = HTMLNode("a", "test.url", props={"href": "http://test.url"})
         self.assertEqual(node.props_to_html(), ' href="http://test.url"')
 
+    def test_eq(self):
+        tree = lambda: ParentNode("div", [LeafNode("b", "x"), ParentNode("p", [LeafNode(None, "y")])], {"id": "a"})
+        self.assertEqual(tree(), tree())
+        other = tree()
+        other.children[1].children[0].value = "z"
+        self.assertNotEqual(tree(), other)
+        self.assertNotEqual(LeafNode("b", "x"), "HTMLNode(b, x, None, None)")
+
+    def test_slots(self):
+        node = LeafNode("b", "x")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+
+    def test_validate_flag(self):
+        with self.assertRaises(AssertionError):
+            HTMLNode(1)
+        htmlnode.validate = False
+        try:
+            self.assertEqual(HTMLNode(1).tag, 1)
+        finally:
+            htmlnode.validate = True
+
     def test_to_html(self):
         node = HTMLNode("a", "test.url")
         with self.assertRaises(NotImplementedError):
@@ -64,5 +90,56 @@ class TestParentNode(unittest.TestCase):
             )
         self.assertEqual(node.to_html(), "<p><b>Bold text</b>Normal text<i>italic text</i>Normal text</p>")
 
+    def test_iter_html(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode("b", "bold"), "raw"]), LeafNode(None, "text")], {"class": "x"})
+        self.assertEqual(list(node.iter_html()), ['<div class="x">', '<p>', '<b>bold</b>', 'raw', '</p>', 'text', '</div>'])
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+
+    def test_write_html(self):
+        node = ParentNode("ul", [LeafNode("li", str(i)) for i in range(3)])
+        fp = io.StringIO()
+        node.write_html(fp)
+        self.assertEqual(fp.getvalue(), "<ul><li>0</li><li>1</li><li>2</li></ul>")
+        with self.assertRaises(ValueError):
+            ParentNode("ul", []).write_html(io.StringIO())
+
+    def deep(self, depth, text="x"):
+        node = LeafNode("b", text)
+        for _ in range(depth):
+            node = ParentNode("blockquote", [node])
+        return node
+
+    def test_deep_tree(self):
+        depth = sys.getrecursionlimit() * 3
+        node = self.deep(depth)
+        self.assertEqual(node.to_html(), "<blockquote>" * depth + "<b>x</b>" + "</blockquote>" * depth)
+        self.assertEqual(repr(node), "HTMLNode(blockquote, None, [" * depth + "HTMLNode(b, x, None, None)" + "], None)" * depth)
+        self.assertEqual(node, self.deep(depth))
+        self.assertNotEqual(node, self.deep(depth, "y"))
+        self.assertNotEqual(node, self.deep(depth - 1))
+
+    def test_deep_tree_errors(self):
+        node = ParentNode("p", [])
+        for _ in range(sys.getrecursionlimit() * 2):
+            node = ParentNode("div", [node])
+        with self.assertRaisesRegex(ValueError, "Must have children"):
+            node.to_html()
+
+    def test_eq(self):
+        node = ParentNode("p", [LeafNode("b", "x"), "raw"], {"class": "a"})
+        self.assertEqual(node, ParentNode("p", [LeafNode("b", "x"), "raw"], {"class": "a"}))
+        self.assertEqual(node, HTMLNode("p", None, [HTMLNode("b", "x"), "raw"], {"class": "a"}))
+        self.assertNotEqual(node, ParentNode("p", [LeafNode("b", "x"), LeafNode(None, "raw")], {"class": "a"}))
+        self.assertNotEqual(node, ParentNode("p", [LeafNode("b", "x")], {"class": "a"}))
+        self.assertNotEqual(node, ParentNode("p", [LeafNode("b", "x"), "raw"]))
+        self.assertNotEqual(HTMLNode("p", None, []), HTMLNode("p"))
+        self.assertNotEqual(node, "p")
+
+    def test_repr_with_raw_children(self):
+        node = ParentNode("p", [LeafNode("b", "x"), "raw", ParentNode("i", [LeafNode(None, "y")])])
+        self.assertEqual(repr(node), "HTMLNode(p, None, [HTMLNode(b, x, None, None), 'raw', "
+                                     "HTMLNode(i, None, [HTMLNode(None, y, None, None)], None)], None)")
+        self.assertEqual(repr(HTMLNode("p", None, [])), "HTMLNode(p, None, [], None)")
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
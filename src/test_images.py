@@ -0,0 +1,119 @@
+import os
+import struct
+import unittest
+import zlib
+
+from fixtures import TempTree
+import helper_functions
+import images
+from textnode import TextNode, TextType
+
+
+def png(width, height):
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = b''.join(b'\0' + b'\x80\x80\x80' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+class TestImages(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = f'{self.root}/public'
+        self.cache = f'{self.root}/cache'
+        self.big = self.write('static/big.png', png(1200, 600))
+        self.small = self.write('static/small.png', png(40, 20))
+
+    def tearDown(self):
+        images.disable()
+
+    def static(self, *extra):
+        entries = {}
+        for path in (self.big, self.small) + extra:
+            st = os.stat(path)
+            entries[path] = {"dest": f'{self.public}/images/{os.path.basename(path)}', "size": st.st_size, "mtime": st.st_mtime_ns}
+        return entries
+
+    def process(self, previous, workers=1):
+        return images.process(self.static(), self.public, previous, workers, 'copy', self.cache)
+
+    def test_read_dimensions(self):
+        self.assertEqual(images.read_dimensions(self.big), (1200, 600))
+        gif = self.write('a.gif', b'GIF89a' + struct.pack('<HH', 17, 9) + b'\0' * 20)
+        self.assertEqual(images.read_dimensions(gif), (17, 9))
+        jpeg = self.write('a.jpg', b'\xff\xd8' + b'\xff\xe0' + struct.pack('>H', 4) + b'ab'
+                          + b'\xff\xc0' + struct.pack('>HBHH', 11, 8, 30, 70) + b'\0' * 6)
+        self.assertEqual(images.read_dimensions(jpeg), (70, 30))
+        self.assertIsNone(images.read_dimensions(self.write('a.txt', b'not an image')))
+        for name, data in (('short.jpg', b'\xff\xd8\xff\xe0\x00'), ('sof.jpg', b'\xff\xd8\xff\xc0\x00\x11\x08'),
+                           ('short.png', png(4, 4)[:20]), ('short.gif', b'GIF89a\x01')):
+            self.assertIsNone(images.read_dimensions(self.write(name, data)), name)
+        self.assertIsNone(images.read_dimensions(f'{self.root}/missing.png'))
+
+    def test_broken_image_does_not_fail_the_build(self):
+        broken = self.write('static/broken.jpg', b'\xff\xd8\xff\xe0\x00')
+        state, changed, _ = images.process(self.static(broken), self.public, images.new_state(), 1, 'copy', self.cache)
+        self.assertEqual(changed, ['/images/big.png', '/images/broken.jpg', '/images/small.png'])
+        self.assertEqual(state["images"][state["urls"]['/images/broken.jpg']["hash"]], {})
+
+    def test_attributes(self):
+        state, changed, stale = self.process(images.new_state())
+        self.assertEqual(changed, ['/images/big.png', '/images/small.png'])
+        self.assertEqual(stale, [])
+        images.enable(state)
+        attributes = images.attributes('/images/small.png', '/images/small.png')
+        self.assertEqual({key: attributes[key] for key in ('width', 'height', 'loading')},
+                         {"width": "40", "height": "20", "loading": "lazy"})
+        self.assertEqual(images.attributes('/images/other.png', '/images/other.png'), {})
+        node = helper_functions.text_node_to_html_node(TextNode('s', TextType.IMAGE, '/images/small.png'))
+        self.assertTrue(node.to_html().startswith('<img src="/images/small.png" alt="s" width="40" height="20"'))
+        version = images.version()
+        images.disable()
+        self.assertNotEqual(images.version(), version)
+        self.assertEqual(helper_functions.text_node_to_html_node(TextNode('s', TextType.IMAGE, '/images/small.png')).props,
+                         {"src": "/images/small.png", "alt": "s"})
+
+    def test_cached_by_hash(self):
+        state, _, _ = self.process(images.new_state())
+        digest = state["urls"]['/images/big.png']["hash"]
+        # A cached entry is trusted while the source hash is unchanged.
+        state["images"][digest] = dict(state["images"][digest], width=1)
+        again, changed, _ = self.process(state)
+        self.assertEqual(changed, [])
+        self.assertEqual(again["images"][digest]["width"], 1)
+
+        self.write('static/big.png', png(800, 400))
+        again, changed, _ = self.process(again)
+        self.assertEqual(changed, ['/images/big.png'])
+        self.assertEqual(again["images"][again["urls"]['/images/big.png']["hash"]]["width"], 800)
+
+        _, changed, _ = images.process({}, self.public, again, cache_dir=self.cache)
+        self.assertEqual(changed, ['/images/big.png', '/images/small.png'])
+
+        # Turning the stage off unpublishes the images but keeps what was learned about them.
+        off, changed, _ = images.drop_urls(again)
+        self.assertEqual((off["urls"], changed), ({}, ['/images/big.png', '/images/small.png']))
+        small = again["urls"]['/images/small.png']["hash"]
+        off["images"][small] = dict(off["images"][small], width=1)
+        back, _, _ = self.process(off)
+        self.assertEqual(back["images"][small]["width"], 1)
+
+    @unittest.skipIf(images.pillow() is None, "Pillow is not installed")
+    def test_variants(self):
+        state, _, _ = self.process(images.new_state(), workers=2)
+        record = state["urls"]['/images/big.png']
+        self.assertEqual(state["images"][record["hash"]]["variants"], [480, 960])
+        self.assertEqual(images.read_dimensions(record["dests"][0]), (480, 240))
+        self.assertEqual(state["urls"]['/images/small.png']["dests"], [])
+        images.enable(state)
+        srcset = images.attributes('/images/big.png', '/images/big.png')["srcset"]
+        self.assertTrue(srcset.endswith(', /images/big.png 1200w'))
+
+        self.write('static/big.png', png(1000, 500))
+        _, _, stale = self.process(state)
+        self.assertEqual(stale, record["dests"])
+
+
+if __name__ == "__main__":
+    unittest.main()
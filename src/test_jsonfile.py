@@ -0,0 +1,25 @@
+import os
+import unittest
+
+from fixtures import TempTree
+import jsonfile
+
+
+class TestJsonFile(TempTree, unittest.TestCase):
+    def test_round_trip_creates_folders(self):
+        path = os.path.join(self.root, 'a', 'b', 'state.json')
+        jsonfile.write_json_atomic(path, {"b": 1, "a": [1, 2]})
+        self.assertEqual(jsonfile.read_json(path), {"a": [1, 2], "b": 1})
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['state.json'])
+        with open(path) as fh:
+            self.assertTrue(fh.read().startswith('{\n "a"'))
+
+    def test_missing_or_broken_gives_default(self):
+        path = os.path.join(self.root, 'state.json')
+        self.assertIsNone(jsonfile.read_json(path))
+        self.write('state.json', '{"half": ')
+        self.assertEqual(jsonfile.read_json(path, {}), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
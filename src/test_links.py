@@ -0,0 +1,61 @@
+import unittest
+
+import helper_functions
+import links
+import parse_cache
+
+
+class TestLinks(unittest.TestCase):
+    def tearDown(self):
+        parse_cache.disable()
+
+    def test_resolve(self):
+        self.assertEqual(links.resolve("/blog/tom", "/"), "/blog/tom")
+        self.assertEqual(links.resolve("../tom/#top", "/blog/glorfindel/"), "/blog/tom/")
+        self.assertEqual(links.resolve("img.png?x=1", "/blog/a.html"), "/blog/img.png")
+        for url in ("https://boot.dev", "mailto:me@example.com", "//cdn.example.com/x.js", "#top", ""):
+            self.assertIsNone(links.resolve(url, "/"))
+
+    def test_output_urls(self):
+        self.assertEqual(links.output_urls("public/blog/tom/index.html", "public"),
+                         {"/blog/tom/index.html", "/blog/tom/", "/blog/tom"})
+        self.assertEqual(links.output_urls("public/index.html", "public"), {"/index.html", "/"})
+        self.assertEqual(links.output_urls("public/about.html", "public"), {"/about.html", "/about"})
+        self.assertEqual(links.page_url("public/blog/tom/index.html", "public"), "/blog/tom/")
+
+    def test_collecting(self):
+        markdown = "# T\n\nGo [home](/) and [out](https://boot.dev)\n\n![tom](/images/tom.png)"
+        with links.collecting() as refs:
+            helper_functions.markdown_to_html_node(markdown)
+        self.assertEqual(refs, [("link", "/"), ("link", "https://boot.dev"), ("image", "/images/tom.png")])
+        self.assertEqual(links.page_entry(refs, "public/blog/index.html", "public"),
+                         {"links": ["/"], "images": ["/images/tom.png"]})
+
+    def test_cache_hit_replays_references(self):
+        parse_cache.enable(parse_cache.ParseCache(path=None))
+        markdown = "# T\n\n[home](/)"
+        with links.collecting() as first:
+            helper_functions.render_markdown(markdown)
+        with links.collecting() as second:
+            helper_functions.render_markdown(markdown)
+        self.assertEqual(first, [("link", "/")])
+        self.assertEqual(second, first)
+
+    def test_index_queries(self):
+        index = links.new_index()
+        index["pages"] = {
+            "public/index.html": {"links": ["/blog/tom", "/gone"], "images": ["/images/a.png"]},
+            "public/blog/tom/index.html": {"links": ["/"], "images": []},
+        }
+        index["template"] = {"links": ["/index.css"], "images": []}
+        outputs = ["public/index.html", "public/blog/tom/index.html", "public/images/a.png",
+                   "public/images/b.png", "public/index.css"]
+        self.assertEqual(links.broken_links(index, outputs, "public"), [("public/index.html", "/gone")])
+        self.assertEqual(links.unreferenced(index, outputs[2:], "public"), ["public/images/b.png"])
+        self.assertEqual(links.affected_pages(index, links.output_urls("public/blog/tom/index.html", "public")),
+                         ["public/index.html"])
+        self.assertEqual(links.affected_pages(index, ["/index.css"]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import assets
+from fixtures import TempTree
+import htmlnode
+import main
+import profiling
+
+
+SRC = os.path.dirname(os.path.abspath(__file__))
+# Build-only modules that render-one must not pay for.
+HEAVY_MODULES = ('PIL', 'asyncio', 'build_plan', 'compress', 'concurrent.futures', 'http.server', 'manifest',
+                 'shards', 'socketserver', 'static_sync', 'watch')
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+
+class TestMain(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.page = self.write('page.md', '# Hello\n\nSome **bold** text.')
+        self.template = self.write('template.html', TEMPLATE)
+
+    def run_main(self, *argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = main.main(list(argv))
+        return code, out.getvalue()
+
+    def test_import_is_cheap(self):
+        probe = ("import sys, main; "
+                 "print(sorted(m for m in ('helper_functions', 'concurrent.futures', 'http.server', 'shutil') if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', probe], cwd=SRC, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_render_one(self):
+        code, out = self.run_main('render-one', self.page, '--template', self.template)
+        self.assertEqual(code, 0)
+        self.assertEqual(out, "<html><title>Hello</title><body><div><h1>Hello</h1><p>Some <b>bold</b> text.</p></div></body></html>")
+
+    def test_render_one_to_file(self):
+        target = f'{self.root}/page.html'
+        code, out = self.run_main('render-one', self.page, '--template', self.template, '-o', target)
+        self.assertEqual((code, out), (0, ""))
+        with open(target) as fh:
+            self.assertIn("<h1>Hello</h1>", fh.read())
+
+    def test_check_files(self):
+        bad = self.write('bad.md', 'no title here')
+        code, out = self.run_main('check', self.page, bad, '--template', self.template)
+        self.assertEqual(code, 1)
+        self.assertNotIn("page.md", out)
+        self.assertIn(f"{bad}: Exception", out)
+
+    def test_render_one_stays_light(self):
+        # Timing lives in `benchmark.py --startup`; here only the imports are checked.
+        probe = ("import sys, main; main.main(sys.argv[1:]); "
+                 f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', probe, 'render-one', self.page, '--template', self.template,
+                                 '-o', f'{self.root}/page.html'], cwd=SRC, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+class TestBuild(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cwd = os.getcwd()
+        self.output = profiling.output
+        self.write('content/index.md', '# Home\n\nHello')
+        self.write('static/index.css', 'body {}')
+        self.write('template.html', '<link href="/index.css"><title>{{ Title }}</title>{{ Content }}')
+        os.chdir(self.root)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        assets.disable()
+        htmlnode.validate = True
+        profiling.set_output(self.output)
+
+    def build(self, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            state, errors = main.build(cache=False, link='copy', **options)
+        self.assertEqual(errors, [])
+        return state
+
+    def test_shard_rejects_output_stages(self):
+        with contextlib.redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit):
+            main.main(['--shard', '1/2', '--fingerprint', '--compress'])
+        self.assertIn("--compress, --fingerprint not supported with --shard or --merge", err.getvalue())
+
+    def test_merge_problems_are_reported(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertEqual(main.main(['--merge', '--shard-dir', 'missing']), 1)
+        self.assertEqual(out.getvalue(), "no shard outputs found\n")
+
+    def test_plain_build_drops_compressed_siblings(self):
+        self.build(precompress=True, fingerprint=True)
+        self.assertTrue(os.path.exists('public/index.html.gz'))
+        state = self.build()
+        self.assertEqual(state["compressed"], {})
+        self.assertEqual(sorted(name for name in os.listdir('public') if name.endswith('.gz')), [])
+
+    def test_quiet_build_keeps_removals_silent(self):
+        self.write('content/old.md', '# Old')
+        self.write('content/index.md', '# Home\n\nSee [old](/old)')
+        self.build()
+        os.remove('content/old.md')
+        profiling.set_output('quiet')
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            state, errors = main.build(cache=False, link='copy')
+        self.assertEqual((errors, out.getvalue()), ([], ""))
+        self.assertFalse(os.path.exists('public/old.html'))
+
+    def test_site_index_follows_plain_builds(self):
+        self.write('content/blog/post.md', '# Old title')
+        self.build(site_url='https://example.org')
+        self.write('content/blog/post.md', '# New title')
+        self.build()
+        self.assertFalse(os.path.exists('public/feed.xml'))
+        self.build(site_url='https://example.org')
+        with open('public/feed.xml') as fh:
+            self.assertIn('<title>New title</title>', fh.read())
+        with open('public/search-index.json') as fh:
+            self.assertIn('New title', fh.read())
+
+    def test_images_cache_outlives_plain_builds(self):
+        self.write('static/a.gif', b'GIF89a' + b'\x11\x00\x09\x00' + b'\0' * 20)
+        self.build(image_stage=True)
+        self.build()
+        with open('.build/images.json') as fh:
+            state = json.load(fh)
+        self.assertEqual(state["urls"], {})
+        self.assertEqual([info["width"] for info in state["images"].values()], [17])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import unittest
+
+from fixtures import TempTree
+import helper_functions
+import manifest
+
+
+class TestManifest(TempTree, unittest.TestCase):
+    def test_hash_file(self):
+        a = self.write('a.md', 'same')
+        b = self.write('b.md', 'same')
+        c = self.write('c.md', 'different')
+        self.assertEqual(manifest.hash_file(a), manifest.hash_file(b))
+        self.assertNotEqual(manifest.hash_file(a), manifest.hash_file(c))
+
+    def test_roundtrip(self):
+        path = os.path.join(self.root, '.build', 'manifest.json')
+        self.assertEqual(manifest.load_manifest(path), manifest.new_manifest())
+        data = manifest.new_manifest()
+        data["pages"]["content/index.md"] = {"hash": "abc", "dest": "public/index.html"}
+        manifest.save_manifest(data, path)
+        self.assertEqual(manifest.load_manifest(path), data)
+
+    def test_corrupt_manifest(self):
+        path = self.write('manifest.json', '{not json')
+        self.assertEqual(manifest.load_manifest(path), manifest.new_manifest())
+
+    def test_stale_outputs(self):
+        old = manifest.new_manifest()
+        new = manifest.new_manifest()
+        old["pages"]["content/a.md"] = {"hash": "1", "dest": "public/a.html"}
+        old["pages"]["content/b.md"] = {"hash": "2", "dest": "public/b.html"}
+        old["static"]["static/x.png"] = {"hash": "3", "dest": "public/x.png"}
+        new["pages"]["content/a.md"] = {"hash": "1", "dest": "public/a.html"}
+        self.assertEqual(manifest.stale_outputs(old, new), ["public/b.html", "public/x.png"])
+
+    def test_remove_outputs(self):
+        public = os.path.join(self.root, 'public')
+        stale = self.write('public/blog/old/index.html', 'x')
+        keep = self.write('public/index.html', 'x')
+        manifest.remove_outputs([stale], public)
+        self.assertFalse(os.path.exists(os.path.join(public, 'blog')))
+        self.assertTrue(os.path.exists(keep))
+
+    def test_generate_pages_incremental(self):
+        content = os.path.join(self.root, 'content')
+        public = os.path.join(self.root, 'public')
+        template = self.write('template.html', '{{ Title }}|{{ Content }}')
+        self.write('content/index.md', '# Home')
+        page = self.write('content/blog/index.md', '# Blog')
+        new = manifest.new_manifest()
+        helper_functions.generate_pages_incremental(content, template, public, manifest.new_manifest(), new)
+        dest = f'{public}/blog/index.html'
+        self.assertEqual(new["pages"][page]["dest"], dest)
+        os.remove(dest)
+        self.write(dest, 'untouched')
+        with open(f'{public}/index.html') as fh:
+            before = fh.read()
+        newer = manifest.new_manifest()
+        helper_functions.generate_pages_incremental(content, template, public, new, newer)
+        with open(dest) as fh:
+            self.assertEqual(fh.read(), 'untouched')
+        self.write('content/blog/index.md', '# Blog 2')
+        helper_functions.generate_pages_incremental(content, template, public, newer, manifest.new_manifest())
+        with open(dest) as fh:
+            self.assertEqual(fh.read(), 'Blog 2|<div><h1>Blog 2</h1></div>')
+        with open(f'{public}/index.html') as fh:
+            self.assertEqual(fh.read(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
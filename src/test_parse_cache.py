@@ -0,0 +1,68 @@
+import os
+import unittest
+
+from fixtures import TempTree
+import helper_functions
+import parse_cache
+
+
+class TestParseCache(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.root, 'cache')
+
+    def tearDown(self):
+        parse_cache.disable()
+
+    def test_key_depends_on_content_and_version(self):
+        self.assertEqual(parse_cache.cache_key("# a"), parse_cache.cache_key("# a"))
+        self.assertNotEqual(parse_cache.cache_key("# a"), parse_cache.cache_key("# b"))
+        self.assertEqual(len(parse_cache.cache_version()), 16)
+
+    def test_parser_modules_follow_imports(self):
+        for name, text in (('helper_functions', 'import os\nfrom a import x\n'), ('a', 'def f():\n    import b, c\n'),
+                           ('b', 'import a\n'), ('d', '')):
+            self.write(f'{name}.py', text)
+        self.assertEqual(list(parse_cache.parser_modules(self.root)), ['a.py', 'b.py', 'helper_functions.py'])
+        self.assertIn('patterns.py', parse_cache.parser_modules())
+
+    def test_memory_lru(self):
+        cache = parse_cache.ParseCache(path=None, max_chars=16)
+        cache.put("a", "12345")
+        cache.put("b", "12345")
+        self.assertEqual(cache.get("a"), "12345")
+        cache.put("c", "12345")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "12345")
+        self.assertEqual(cache.get("c"), "12345")
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_disk_shared_between_instances(self):
+        parse_cache.ParseCache(self.path).put("# a", "<h1>a</h1>")
+        cache = parse_cache.ParseCache(self.path)
+        self.assertEqual(cache.get("# a"), "<h1>a</h1>")
+        self.assertIsNone(cache.get("# b"))
+
+    def test_prune(self):
+        cache = parse_cache.ParseCache(self.path, max_disk_bytes=25)
+        for i, text in enumerate(["old", "mid", "new"]):
+            cache.put(text, "x" * 10)
+            path = cache._file(parse_cache.cache_key(text))
+            os.utime(path, ns=(i * 10**9, i * 10**9))
+        self.assertEqual(cache.prune(), 1)
+        fresh = parse_cache.ParseCache(self.path)
+        self.assertIsNone(fresh.get("old"))
+        self.assertEqual(fresh.get("new"), "x" * 10)
+
+    def test_render_markdown_uses_active_cache(self):
+        markdown = "# Title\n\nSome **text**"
+        expected = helper_functions.markdown_to_html_node(markdown).to_html()
+        cache = parse_cache.enable(parse_cache.ParseCache(path=None))
+        self.assertEqual(helper_functions.render_markdown(markdown), expected)
+        cache.entries[parse_cache.cache_key(markdown)] = ({"html": "<p>cached</p>", "refs": []}, 0)
+        self.assertEqual(helper_functions.render_markdown(markdown), "<p>cached</p>")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import io
+import json
+import unittest
+from contextlib import redirect_stdout
+
+from fixtures import TempTree
+import helper_functions
+import profiling
+
+
+class TestProfiling(TempTree, unittest.TestCase):
+    def tearDown(self):
+        profiling.disable()
+        profiling.set_output('verbose')
+
+    def test_disabled_stage_is_noop(self):
+        with profiling.stage('read'):
+            pass
+        self.assertIsNone(profiling.end_page())
+
+    def test_page_stages(self):
+        profiler = profiling.enable()
+        template = self.write('template.html', '{{ Title }}|{{ Content }}')
+        for i in range(3):
+            self.write(f'content/page{i}.md', f'# Page {i}\n\n' + 'Some **bold** text\n\n' * (i * 20 + 1))
+        pages = helper_functions.discover_pages(f'{self.root}/content', f'{self.root}/public')
+        profiling.set_output('quiet')
+        with redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(helper_functions.generate_pages(pages, template), [])
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual(len(profiler.pages), 3)
+        for stages in profiler.pages.values():
+            self.assertTrue(set(profiling.STAGES) <= set(stages), stages)
+            self.assertGreaterEqual(stages["total"], sum(stages[name] for name in ('read', 'write')))
+        profiler.add_section('static', 0.5, files=2, bytes=10)
+        report_path = f'{self.root}/report.json'
+        profiler.write_report(report_path, n=2)
+        with open(report_path) as fh:
+            report = json.load(fh)
+        self.assertEqual(report["pages"], 3)
+        self.assertEqual(len(report["slowest"]), 2)
+        self.assertEqual(report["sections"]["static"], {"seconds": 0.5, "files": 2, "bytes": 10})
+        self.assertNotIn("total", report["stages"])
+        self.assertIn("Slowest 2 pages", profiler.summary(2))
+
+    def test_output_modes(self):
+        with redirect_stdout(io.StringIO()) as out:
+            profiling.page_done(1, 2, "page one")
+            profiling.set_output('quiet')
+            profiling.page_done(2, 2, "page two")
+        self.assertEqual(out.getvalue(), "page one\n")
+        with self.assertRaises(ValueError):
+            profiling.set_output('loud')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import unittest
+
+import build_plan
+from fixtures import TempTree
+import helper_functions
+import profiling
+import shards
+
+
+class TestShards(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = self.write('template.html', '{{ Title }}|{{ Content }}')
+        for i in range(9):
+            self.write(f'content/section{i % 3}/page{i}.md', f'# Page {i}\n\n' + 'Body text. ' * (i * 20))
+        self.write('static/index.css', 'body {}')
+        self.write('static/images/a.png', 'png-a')
+        self.output = profiling.output
+        profiling.set_output('quiet')
+
+    def tearDown(self):
+        profiling.set_output(self.output)
+
+    def build(self, count, shard_dir='shards'):
+        for index in range(1, count + 1):
+            errors = shards.build_shard(index, count, f'{self.root}/content', f'{self.root}/static', self.template,
+                                        f'{self.root}/{shard_dir}', link='copy')
+            self.assertEqual(errors, [])
+
+    def test_parse_shard(self):
+        self.assertEqual(shards.parse_shard('2/4'), (2, 4))
+        for value in ('0/4', '5/4', '2', 'a/b'):
+            with self.assertRaises(ValueError):
+                shards.parse_shard(value)
+
+    def test_assign_balanced_and_deterministic(self):
+        plan = build_plan.scan(f'{self.root}/content', 'public', build_plan.PAGE)
+        owners = shards.assign(plan, 3, 'public')
+        self.assertEqual(owners, shards.assign(list(reversed(plan)), 3, 'public'))
+        self.assertEqual(set(owners), {entry.source for entry in plan})
+        loads = [sum(entry.size for entry in plan if owners[entry.source] == shard) for shard in (1, 2, 3)]
+        self.assertLess(max(loads) - min(loads), max(entry.size for entry in plan))
+
+    def test_merge_matches_single_build(self):
+        self.build(3)
+        merged = shards.merge(f'{self.root}/shards', f'{self.root}/public', 'copy')
+        self.assertEqual(merged, 11)
+        pages = helper_functions.discover_pages(f'{self.root}/content', f'{self.root}/single')
+        helper_functions.generate_pages(pages, self.template)
+        for _, dest in pages:
+            with open(dest) as single, open(dest.replace('/single/', '/public/')) as public:
+                self.assertEqual(public.read(), single.read())
+        self.assertTrue(os.path.isfile(f'{self.root}/public/images/a.png'))
+        self.assertFalse(os.path.exists(f'{self.root}/public/{shards.SHARD_MANIFEST}'))
+
+    def test_verify_reports_problems(self):
+        self.build(3)
+        loaded = shards.load_shards(f'{self.root}/shards')
+        self.assertEqual(shards.verify(loaded), [])
+        self.assertIn("shard 3/3 is missing", shards.verify(loaded[:2]))
+        problems = shards.verify(loaded + loaded[:1])
+        self.assertIn(f"shard 1/3 appears more than once: {self.root}/shards/1, {self.root}/shards/1", problems)
+        self.assertTrue(any("is duplicated in" in problem for problem in problems))
+
+        self.write('content/extra.md', '# Extra')
+        self.build(1, 'other')
+        problems = shards.verify(loaded + shards.load_shards(f'{self.root}/other'))
+        self.assertTrue(any("different content tree" in problem for problem in problems))
+        with self.assertRaises(shards.ShardMergeError):
+            shards.merge(f'{self.root}/content', f'{self.root}/public')
+
+
+if __name__ == "__main__":
+    unittest.main()
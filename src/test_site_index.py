@@ -0,0 +1,79 @@
+import json
+import unittest
+
+from fixtures import TempTree
+import helper_functions
+import profiling
+import site_index
+
+
+class TestSiteIndex(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = f'{self.root}/public'
+        self.template = self.write('template.html', '{{ Title }}|{{ Content }}')
+        self.write('content/index.md', '# Home\n\n![logo](/logo.png)\n\nWelcome **home**, see [the blog](/blog/).')
+        self.write('content/blog/index.md', '# Blog\n\nAll posts.')
+        self.write('content/blog/first.md', '# First & best\n\nHello <world> from _the_ first post.')
+        self.output = profiling.output
+        profiling.set_output('quiet')
+
+    def tearDown(self):
+        profiling.set_output(self.output)
+
+    def collect(self, jobs=1, io_concurrency=0):
+        pages = helper_functions.discover_pages(f'{self.root}/content', self.public)
+        page_info = {}
+        errors = helper_functions.generate_pages(pages, self.template, jobs, io_concurrency=io_concurrency, page_info=page_info)
+        self.assertEqual(errors, [])
+        entries = {dest: {"source": source, "mtime": 1_700_000_000 * 10**9 + i, "hash": str(i)}
+                   for i, (source, dest) in enumerate(pages)}
+        return page_info, entries
+
+    def test_summary_and_tokens(self):
+        self.assertEqual(helper_functions.extract_summary('# T\n\n![a](/a.png)\n\nSome **bold** [link](/x) text'),
+                         'Some bold link text')
+        self.assertEqual(helper_functions.extract_summary('# Only a title'), '')
+        self.assertEqual(site_index.tokenize('Read [the Docs](/docs/page) a b 42'), ['42', 'docs', 'read', 'the'])
+
+    def test_collected_while_rendering(self):
+        for jobs, io_concurrency in ((1, 0), (2, 0), (1, 2)):
+            page_info, _ = self.collect(jobs, io_concurrency)
+            self.assertEqual(page_info[f'{self.public}/index.html']["summary"], 'Welcome home, see the blog.')
+            self.assertEqual(page_info[f'{self.public}/blog/first.html']["title"], 'First & best')
+        self.assertEqual(helper_functions.generate_pages([], self.template, page_info={}), [])
+
+    def test_store_and_outputs(self):
+        page_info, entries = self.collect()
+        store = site_index.update_store(site_index.new_store(), page_info, entries, self.public)
+        self.assertEqual(store["pages"][f'{self.public}/blog/index.html']["url"], '/blog/')
+        outputs, written = site_index.emit(store, self.public, 'https://example.org/', f'{self.root}/content')
+        self.assertEqual(written, outputs)
+        self.assertEqual(site_index.emit(store, self.public, 'https://example.org', f'{self.root}/content')[1], [])
+
+        with open(f'{self.public}/sitemap.xml') as fh:
+            sitemap = fh.read()
+        self.assertIn('<loc>https://example.org/blog/first.html</loc><lastmod>2023-11-14</lastmod>', sitemap)
+        with open(f'{self.public}/feed.xml') as fh:
+            feed = fh.read()
+        self.assertIn('<title>Home</title>', feed)
+        self.assertIn('<item><title>First &amp; best</title>', feed)
+        self.assertIn('<description>Hello &lt;world&gt; from the first post.</description>', feed)
+        self.assertNotIn('All posts', feed)
+        with open(f'{self.public}/search-index.json') as fh:
+            search = json.load(fh)
+        urls = [page[0] for page in search["pages"]]
+        self.assertEqual(urls, ['/', '/blog/', '/blog/first.html'])
+        self.assertEqual([urls[i] for i in search["terms"]["blog"]], ['/', '/blog/'])
+
+        # Only changed pages are collected again; removed pages drop out.
+        del entries[f'{self.public}/blog/index.html']
+        store = site_index.update_store(store, {}, entries, self.public)
+        self.assertEqual(len(store["pages"]), 2)
+        path = f'{self.root}/site.json'
+        site_index.save_store(store, path)
+        self.assertEqual(site_index.load_store(path), store)
+
+
+if __name__ == "__main__":
+    unittest.main()
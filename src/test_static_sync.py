@@ -0,0 +1,62 @@
+import os
+import unittest
+
+import build_plan
+from fixtures import TempTree
+import static_sync
+
+
+class TestStaticSync(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.src = f'{self.root}/static'
+        self.dst = f'{self.root}/public'
+        self.write('static/index.css', 'body {}')
+        self.write('static/images/a.png', 'png-a')
+        self.write('static/images/b.png', 'png-b')
+
+    def test_sync_tree(self):
+        entries, stats = static_sync.sync_tree(self.src, self.dst, mode='copy')
+        self.assertEqual(sorted(entry["dest"] for entry in entries.values()), [
+            f'{self.dst}/images/a.png', f'{self.dst}/images/b.png', f'{self.dst}/index.css'])
+        self.assertEqual((stats["synced"], stats["bytes"], stats["methods"]), (3, 17, {"copy": 3}))
+        with open(f'{self.dst}/images/b.png') as fh:
+            self.assertEqual(fh.read(), 'png-b')
+
+        _, stats = static_sync.sync_tree(self.src, self.dst, mode='copy')
+        self.assertEqual((stats["synced"], stats["skipped"]), (0, 3))
+
+        self.write('static/images/a.png', 'png-a2')
+        _, stats = static_sync.sync_tree(self.src, self.dst, mode='copy')
+        self.assertEqual(stats["synced"], 1)
+
+    def test_checksum_ignores_mtime(self):
+        static_sync.sync_tree(self.src, self.dst, mode='copy')
+        os.utime(f'{self.src}/index.css', ns=(1, 1))
+        _, stats = static_sync.sync_tree(self.src, self.dst, mode='copy', checksum=True)
+        self.assertEqual(stats["synced"], 0)
+        _, stats = static_sync.sync_tree(self.src, self.dst, mode='copy')
+        self.assertEqual(stats["synced"], 1)
+
+    def test_hardlink(self):
+        _, stats = static_sync.sync_tree(self.src, self.dst, mode='hardlink')
+        self.assertEqual(stats["methods"], {"hardlink": 3})
+        self.assertTrue(os.path.samefile(f'{self.src}/index.css', f'{self.dst}/index.css'))
+        _, stats = static_sync.sync_tree(self.src, self.dst, mode='hardlink')
+        self.assertEqual(stats["synced"], 0)
+
+    def test_reflink_falls_back_to_copy(self):
+        method = static_sync.sync_file(f'{self.src}/index.css', f'{self.dst}/nested/index.css', 'reflink')
+        self.assertIn(method, ('reflink', 'copy'))
+        entry = build_plan.scan(self.src, f'{self.dst}/nested', build_plan.STATIC)[-1]
+        outputs = build_plan.scan_outputs(self.dst)
+        self.assertFalse(static_sync.needs_sync(entry, outputs[f'{self.dst}/nested/index.css']))
+        self.assertTrue(static_sync.needs_sync(entry, None))
+
+    def test_missing_source(self):
+        with self.assertRaises(Exception):
+            static_sync.sync_tree(f'{self.root}/nope', self.dst)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import unittest
+
+from fixtures import TempTree
+import helper_functions
+import templates
+from htmlnode import LeafNode, ParentNode
+
+
+class TestTemplates(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.root, 'template.html')
+        templates.clear_cache()
+
+    def write_template(self, text, mtime):
+        self.write('template.html', text)
+        os.utime(self.path, ns=(mtime, mtime))
+
+    def test_segments(self):
+        template = templates.Template("<title>{{ Title }}</title>{{Content}}!")
+        self.assertEqual(template.segments, [
+            (False, "<title>"),
+            (True, "Title", "{{ Title }}"),
+            (False, "</title>"),
+            (True, "Content", "{{Content}}"),
+            (False, "!"),
+        ])
+        self.assertEqual(template.variables(), {"Title", "Content"})
+
+    def test_render(self):
+        template = templates.Template("{{ Title }}|{{ Content }}|{{ Author }}|{{ Missing }}")
+        content = ParentNode('div', [LeafNode('p', 'hi')])
+        self.assertEqual(template.render({"Title": "T", "Content": content, "Author": "Me"}),
+                         "T|<div><p>hi</p></div>|Me|{{ Missing }}")
+
+    def test_cache_invalidated_by_mtime(self):
+        self.write_template("{{ Title }} one", 1_000_000_000)
+        first = templates.load_template(self.path)
+        self.assertIs(templates.load_template(self.path), first)
+        self.write_template("{{ Title }} two", 2_000_000_000)
+        second = templates.load_template(self.path)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.render({"Title": "x"}), "x two")
+
+    def test_extract_metadata(self):
+        metadata, body = helper_functions.extract_metadata("---\nAuthor: Tolkien\ndate: 1954\n---\n# Title\n")
+        self.assertEqual(metadata, {"Author": "Tolkien", "date": "1954"})
+        self.assertEqual(body, "# Title\n")
+        self.assertEqual(helper_functions.extract_metadata("# Title\n---\n"), ({}, "# Title\n---\n"))
+
+    def test_generate_page_metadata(self):
+        self.write_template("<h1>{{ Title }}</h1><i>{{ Author }}</i>{{ Content }}", 1_000_000_000)
+        source = self.write('index.md', "---\nAuthor: Tolkien\n---\n# Hobbit\n")
+        dest = os.path.join(self.root, 'out', 'index.html')
+        helper_functions.generate_page(source, self.path, dest, quiet=True)
+        with open(dest) as fh:
+            self.assertEqual(fh.read(), "<h1>Hobbit</h1><i>Tolkien</i><div><h1>Hobbit</h1></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -23,6 +23,10 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("This is a node", TextType.BOLD)
         node2 = TextNode("This is a text node", TextType.ITALIC)
         self.assertNotEqual(node, node2)
+    def test_neq_other_type(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertNotEqual(node, "TextNode(This is a text node, Bold, None)")
+        self.assertFalse(hasattr(node, "__dict__"))
 
 if __name__ == "__main__":
     unittest.main()
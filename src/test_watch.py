@@ -0,0 +1,90 @@
+import gzip
+import os
+import unittest
+import urllib.request
+
+import compress
+from fixtures import TempTree
+import links
+import manifest
+import watch
+
+
+class TestWatch(TempTree, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = f'{self.root}/content'
+        self.static = f'{self.root}/static'
+        self.public = f'{self.root}/public'
+        self.template = self.write('template.html', '{{ Title }}|{{ Content }}')
+        self.write('content/index.md', '# Home')
+        self.write('content/blog/index.md', '# Blog')
+        self.write('static/index.css', 'body {}')
+
+    def read(self, path):
+        with open(f'{self.root}/{path}') as fh:
+            return fh.read()
+
+    def rebuild(self, changed, state, index):
+        return watch.rebuild_changed(changed, state, index, self.content, self.static, self.template, self.public)
+
+    def test_polling_watcher(self):
+        watcher = watch.PollingWatcher([self.content, self.template])
+        self.assertEqual(watcher.poll(), set())
+        page = self.write('content/index.md', '# Home, edited')
+        os.remove(f'{self.content}/blog/index.md')
+        new = self.write('content/new.md', '# New')
+        self.assertEqual(watcher.poll(), {page, new, f'{self.content}/blog/index.md'})
+        self.assertEqual(watcher.poll(), set())
+
+    def test_rebuild_changed(self):
+        state = manifest.new_manifest()
+        index = links.new_index()
+        changed = {f'{self.content}/index.md', f'{self.content}/blog/index.md', f'{self.static}/index.css'}
+        self.assertEqual(self.rebuild(changed, state, index), [])
+        self.assertEqual(self.read('public/blog/index.html'), 'Blog|<div><h1>Blog</h1></div>')
+        self.assertEqual(self.read('public/index.css'), 'body {}')
+
+        self.write('content/index.md', '# Home 2')
+        self.write('public/blog/index.html', 'untouched')
+        self.rebuild({f'{self.content}/index.md'}, state, index)
+        self.assertEqual(self.read('public/index.html'), 'Home 2|<div><h1>Home 2</h1></div>')
+        self.assertEqual(self.read('public/blog/index.html'), 'untouched')
+
+        os.remove(f'{self.content}/blog/index.md')
+        self.rebuild({f'{self.content}/blog/index.md'}, state, index)
+        self.assertFalse(os.path.exists(f'{self.public}/blog'))
+
+        self.write('template.html', '<b>{{ Title }}</b>')
+        self.rebuild({self.template}, state, index)
+        self.assertEqual(self.read('public/index.html'), '<b>Home 2</b>')
+        self.assertEqual(sorted(state["pages"]), [f'{self.content}/index.md'])
+        self.assertEqual(sorted(index["pages"]), [f'{self.public}/index.html'])
+        self.assertFalse(os.path.exists(f'{self.root}/.build'))
+
+    def test_accepted_encodings(self):
+        self.assertEqual(watch.accepted_encodings('gzip, deflate, br'), {'gzip', 'deflate', 'br'})
+        self.assertEqual(watch.accepted_encodings('br;q=0, gzip;q=0.5'), {'gzip'})
+        self.assertEqual(watch.accepted_encodings(None), set())
+
+    def test_serves_precompressed(self):
+        os.makedirs(self.public)
+        self.write('public/index.html', '<p>hi</p>')
+        compress.process_outputs([f'{self.public}/index.html'], {})
+        server = watch.serve(self.public, 0, '127.0.0.1')
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}/'
+            for encoding, expected in (('gzip', 'gzip'), ('identity', None)):
+                request = urllib.request.Request(url, headers={'Accept-Encoding': encoding})
+                with urllib.request.urlopen(request) as response:
+                    self.assertEqual(response.headers.get('Content-Encoding'), expected)
+                    self.assertEqual(response.headers.get('Content-Type'), 'text/html')
+                    body = response.read()
+                    self.assertEqual(gzip.decompress(body) if expected else body, b'<p>hi</p>')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,12 +10,16 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ('text', 'text_type', 'url')
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
         self.url = url
 
     def __eq__(self, other):
+        if not isinstance(other, TextNode):
+            return NotImplemented
         return self.text == other.text and self.text_type == other.text_type and self.url == other.url
     
     def __repr__(self):
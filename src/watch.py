@@ -0,0 +1,206 @@
+import functools
+import os
+import queue
+import re
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import assets
+import build_plan
+import compress
+import helper_functions
+import links
+import manifest
+import profiling
+import static_sync
+
+
+def snapshot(paths):
+    state = {}
+    for path in paths:
+        if os.path.isfile(path):
+            st = os.stat(path)
+            state[path] = (st.st_mtime_ns, st.st_size)
+            continue
+        try:
+            entries = build_plan.scan(path, path, build_plan.OUTPUT)
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            state[entry.source] = (entry.mtime, entry.size)
+    return state
+
+
+class PollingWatcher:
+    def __init__(self, paths, interval=0.25):
+        self.paths = paths
+        self.interval = interval
+        self.state = snapshot(paths)
+
+    def poll(self):
+        current = snapshot(self.paths)
+        changed = {path for path, stat in current.items() if self.state.get(path) != stat}
+        changed.update(path for path in self.state if path not in current)
+        self.state = current
+        return changed
+
+    def changes(self):
+        while True:
+            changed = self.poll()
+            if changed:
+                return changed
+            time.sleep(self.interval)
+
+    def stop(self):
+        pass
+
+
+class EventWatcher:
+    def __init__(self, paths, observer_class, handler_class, settle=0.05):
+        self.events = queue.Queue()
+        self.settle = settle
+        watcher = self
+
+        class Handler(handler_class):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                watcher.events.put(os.path.relpath(event.src_path))
+                if getattr(event, 'dest_path', None):
+                    watcher.events.put(os.path.relpath(event.dest_path))
+
+        self.observer = observer_class()
+        for path in paths:
+            if os.path.isfile(path):
+                self.observer.schedule(Handler(), os.path.dirname(path) or '.', recursive=False)
+            else:
+                self.observer.schedule(Handler(), path, recursive=True)
+        self.paths = paths
+        self.observer.start()
+
+    def changes(self):
+        changed = {self.events.get()}
+        time.sleep(self.settle)
+        while not self.events.empty():
+            changed.add(self.events.get())
+        return {path for path in changed if any(path == p or path.startswith(p + os.sep) for p in self.paths)}
+
+    def stop(self):
+        self.observer.stop()
+        self.observer.join()
+
+
+def make_watcher(paths, interval=0.25, polling=False):
+    if not polling:
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            pass
+        else:
+            return EventWatcher(paths, Observer, FileSystemEventHandler)
+    return PollingWatcher(paths, interval)
+
+
+def accepted_encodings(header):
+    encodings = set()
+    for part in (header or '').split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if name and not re.search(r'q\s*=\s*0(?:\.0*)?\s*$', params):
+            encodings.add(name)
+    return encodings
+
+
+class PrecompressedHandler(SimpleHTTPRequestHandler):
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split('?', 1)[0].endswith('/'):
+            path = os.path.join(path, 'index.html')
+        accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+        if os.path.isfile(path):
+            for encoding, suffix in self.encodings:
+                if encoding in accepted and os.path.isfile(path + suffix):
+                    return self.send_encoded(path, path + suffix, encoding)
+        return super().send_head()
+
+    def end_headers(self):
+        if assets.HASHED_RE.search(self.path.split('?', 1)[0]):
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        super().end_headers()
+
+    def send_encoded(self, path, encoded_path, encoding):
+        fh = open(encoded_path, 'rb')
+        try:
+            st = os.fstat(fh.fileno())
+            self.send_response(200)
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(st.st_size))
+            self.send_header("Last-Modified", self.date_time_string(st.st_mtime))
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return fh
+        except BaseException:
+            fh.close()
+            raise
+
+
+def serve(directory, port=8888, host=''):
+    handler = functools.partial(PrecompressedHandler, directory=directory)
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def output_path(path, src, dst):
+    return f'{dst}{path[len(src):]}'
+
+
+def rebuild_changed(changed, state, index, content='content', static='static', template='template.html', public='public', jobs=1, link='reflink', minify=False, precompress=False):
+    # state and index stay in memory between edits; the caller saves them when watching stops.
+    pages = []
+    removed = []
+    synced = []
+    for path in sorted(changed):
+        if path.startswith(content + '/'):
+            dest = build_plan.page_dest(output_path(path, content, public))
+            if os.path.isfile(path):
+                st = os.stat(path)
+                state["pages"][path] = {"hash": manifest.hash_file(path), "dest": dest, "size": st.st_size, "mtime": st.st_mtime_ns}
+                pages.append((path, dest))
+            elif state["pages"].pop(path, None):
+                removed.append(dest)
+        elif path.startswith(static + '/'):
+            dest = output_path(path, static, public)
+            if os.path.isfile(path):
+                static_sync.sync_file(path, dest, link)
+                synced.append(dest)
+                st = os.stat(path)
+                state["static"][path] = {"dest": dest, "size": st.st_size, "mtime": st.st_mtime_ns}
+            elif state["static"].pop(path, None):
+                removed.append(dest)
+    if template in changed:
+        state["template"][template] = {"hash": manifest.hash_file(template)}
+        pages = [(path, entry["dest"]) for path, entry in sorted(state["pages"].items())]
+    manifest.remove_outputs(sorted(removed + compress.siblings(removed)), public)
+    page_refs = {}
+    errors = helper_functions.generate_pages(pages, template, jobs, page_refs)
+    for path, _ in errors:
+        state["pages"].pop(path, None)
+    if minify or precompress:
+        compressed = state.setdefault("compressed", {})
+        for dest in removed:
+            compressed.pop(dest, None)
+        rendered = [dest for path, dest in pages if path in state["pages"]]
+        records, _ = compress.process_outputs(rendered + synced, compressed, rendered if minify else (), precompress)
+        compressed.update(records)
+    links.update_index(index, page_refs, {entry["dest"] for entry in state["pages"].values()}, public, template)
+    if profiling.output != 'quiet':
+        for page in links.affected_pages(index, [url for dest in removed for url in links.output_urls(dest, public)]):
+            print(f"warning: {page} references a removed page or asset")
+    return errors